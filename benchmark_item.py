@@ -0,0 +1,96 @@
+import sys
+import jsonio
+
+# Fields of a merged benchmark item, in the order they are written to JSONL
+FIELDS = (
+    "uid",
+    "test_id",
+    "section",
+    "subsection",
+    "question_id",
+    "question_resource",
+    "question",
+    "option_a",
+    "option_b",
+    "option_c",
+    "option_d",
+    "option_e",
+    "system_prompt",
+    "prompt",
+    "answer",
+    "source",
+    "passage_id",
+)
+FIELD_SET = frozenset(FIELDS)
+# Fields that are only written when set
+OPTIONAL_FIELDS = {"passage_id"}
+DEFAULTS = {"question_id": None, "question_resource": None, "passage_id": None}
+# Values shared by many items; interned so all items point at a single string
+INTERNED_FIELDS = frozenset(
+    ["test_id", "section", "subsection", "system_prompt", "source"]
+)
+
+
+class BenchmarkItem:
+    """
+    One benchmark question. Slotted and with repeated strings interned, so a few hundred
+    thousand items cost far less memory than the equivalent dicts. Supports get() and
+    item["field"] so code written against the JSONL dicts keeps working.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        unknown = fields.keys() - FIELD_SET
+        if unknown:
+            raise TypeError(f"Unknown BenchmarkItem fields: {sorted(unknown)}")
+        self._set_fields(fields)
+
+    def _set_fields(self, data):
+        for name in FIELDS:
+            value = data.get(name, DEFAULTS.get(name, ""))
+            if name in INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds an item from a JSONL-schema dict, ignoring keys outside the schema."""
+        item = cls.__new__(cls)
+        item._set_fields(data)
+        return item
+
+    @classmethod
+    def from_json(cls, line):
+        return cls.from_dict(jsonio.loads(line))
+
+    def to_dict(self):
+        return {
+            name: getattr(self, name)
+            for name in FIELDS
+            if name not in OPTIONAL_FIELDS or getattr(self, name) is not None
+        }
+
+    def to_json(self):
+        return jsonio.dumps(self.to_dict())
+
+    def replace(self, **changes):
+        return BenchmarkItem(**{**self.to_dict(), **changes})
+
+    def get(self, name, default=None):
+        if name not in FIELD_SET:
+            return default
+        return getattr(self, name)
+
+    def __getitem__(self, name):
+        if name not in FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __eq__(self, other):
+        if not isinstance(other, BenchmarkItem):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in FIELDS)
+
+    def __repr__(self):
+        return f"BenchmarkItem(uid={self.uid!r}, source={self.source!r})"
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in ["process_verbal_sections", "scripts", ""]:
+    sys.path.insert(0, os.path.join(REPO_ROOT, path))
+
+import synthetic  # noqa: E402
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def time_it(fn, repeat=5, number=1):
+    """Runs fn `number` times per sample and returns per-call timings of `repeat` samples."""
+    fn()  # warm-up (imports, regex compilation, file cache)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def build_benchmarks(workdir):
+    """Returns {name: (fn, number)}; inputs are prepared here, outside the timed calls."""
+    import pdfplumber
+    from compare_benchmarks import normalize_text
+    from exam_repository import build_index, exam_files
+    from merge_benchmarks import construct_prompt, dedup, load_swesat
+    from parse_las import extract_text_from_columns, parse_question_string
+    from scoring import is_correct
+    from verbal_utils import parse_mek
+
+    question_string = synthetic.question_string()
+    words = synthetic.column_words()
+    mek_pdf = os.path.join(workdir, "mek.pdf")
+    synthetic.write_mek_pdf(mek_pdf)
+
+    swesat_items = load_swesat()
+    questions = [item["question"] for item in swesat_items]
+    options = [
+        {k: item[f"option_{k.lower()}"] for k in "ABCDE" if item[f"option_{k.lower()}"]}
+        for item in swesat_items
+    ]
+    subsections = [item["subsection"] for item in swesat_items]
+    items = synthetic.benchmark_items()
+    generations = [f"Svar: {item['answer']}" for item in items]
+
+    def parse_mek_pdf():
+        with pdfplumber.open(mek_pdf) as reader:
+            parse_mek(reader, range(len(reader.pages)))
+
+    return {
+        "parse_question_string": (lambda: parse_question_string(question_string), 50),
+        "extract_text_from_columns": (
+            lambda: extract_text_from_columns(
+                words, 297, page_height=842, y_limit=800, above=True
+            ),
+            50,
+        ),
+        "parse_mek": (parse_mek_pdf, 1),
+        "normalize_text": (lambda: [normalize_text(q) for q in questions], 5),
+        "build_exam_index": (lambda: build_index("exams", exam_files("exams")), 1),
+        "load_swesat": (load_swesat, 1),
+        "construct_prompt": (
+            lambda: [
+                construct_prompt(s, q, o)
+                for s, q, o in zip(subsections, questions, options)
+            ],
+            10,
+        ),
+        "dedup": (lambda: dedup(items), 3),
+        "answer_scoring": (
+            lambda: [is_correct(i, g) for i, g in zip(items, generations)],
+            3,
+        ),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(label=None, repeat=5, only=None):
+    # The exam repository reads the relative "exams" directory
+    os.chdir(REPO_ROOT)
+    commit = git_commit()
+    label = label or commit
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (fn, number) in build_benchmarks(workdir).items():
+            if only and name not in only:
+                continue
+            results[name] = time_it(fn, repeat=repeat, number=number)
+            print(f"{name:<28} {results[name]['median_s'] * 1000:10.3f} ms")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{label}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            json.dumps(
+                {
+                    "label": label,
+                    "commit": commit,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "timestamp": time.time(),
+                    "results": results,
+                },
+                indent=4,
+            )
+        )
+    print(f"Results written to {path}")
+    return path
+
+
+def compare(base_path, new_path, threshold=0.1):
+    """Prints median timings side by side; returns True if any benchmark regressed."""
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{'Benchmark':<28} {base['label']:>12} {new['label']:>12} {'ratio':>7}")
+    regressed = False
+    for name, result in new["results"].items():
+        if name not in base["results"]:
+            continue
+        before = base["results"][name]["median_s"]
+        after = result["median_s"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:<28} {before * 1000:10.3f}ms {after * 1000:10.3f}ms {ratio:6.2f}x{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline micro/macro benchmarks for the parser, merge and scoring hot paths"
+    )
+    parser.add_argument(
+        "--label", type=str, default=None, help="Results name (defaults to git commit)"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="*", default=None, help="Run only these benchmarks"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASE", "NEW"),
+        default=None,
+        help="Compare two results files (labels in benchmarks/results/ or paths)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown of the median counted as a regression",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        paths = [
+            p if os.path.isfile(p) else os.path.join(RESULTS_DIR, f"{p}.json")
+            for p in args.compare
+        ]
+        sys.exit(1 if compare(*paths, threshold=args.threshold) else 0)
+
+    run(label=args.label, repeat=args.repeat, only=args.only)
+
+
+if __name__ == "__main__":
+    main()
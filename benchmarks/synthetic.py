@@ -0,0 +1,147 @@
+import random
+
+WORDS = (
+    "att och det som en på är av för med till den har de inte om ett han men var jag "
+    "sig från vi så kan man när år säga hon under också efter eller nu sin där vid "
+    "mycket skulle få mot kunna blir mellan finns samhället forskning utveckling "
+    "läsförståelse människor betydelse språket kvantitet påståendena svarsförslag"
+).split()
+
+
+def sentence(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def question_string(n_questions=40, seed=0):
+    """LÄS-style question block as produced by extract_text_from_columns()."""
+    rng = random.Random(seed)
+    parts = []
+    for q in range(1, n_questions + 1):
+        parts.append(f"{q}. {sentence(rng, 12).capitalize()}?")
+        for letter in "ABCD":
+            parts.append(f"{letter} {sentence(rng, 6)}")
+    return " ".join(parts)
+
+
+def column_words(n_words=600, page_width=595, page_height=842, seed=0):
+    """Word dicts shaped like pdfplumber's extract_words(extra_attrs=["fontname", "size"])."""
+    rng = random.Random(seed)
+    words = []
+    for i in range(n_words):
+        x0 = rng.uniform(40, page_width - 80)
+        bottom = 70 + (i // 12) * 14 % (page_height - 140)
+        words.append(
+            {
+                "text": rng.choice(WORDS),
+                "x0": x0,
+                "x1": x0 + 30,
+                "top": bottom - 10,
+                "bottom": bottom,
+                "size": 24 if i == 0 else 10,
+                "fontname": "Helvetica",
+            }
+        )
+    return words
+
+
+def mek_page_lines(first_question, n_questions, seed=0):
+    rng = random.Random(seed + first_question)
+    lines = []
+    for q in range(first_question, first_question + n_questions):
+        lines.append(f"{q}. {sentence(rng, 9)} _____ {sentence(rng, 7)}")
+        lines.append(sentence(rng, 10))
+        for letter in "ABCD":
+            lines.append(f"{letter} {sentence(rng, 2)}")
+    return lines
+
+
+def _pdf_text(text):
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return escaped.encode("cp1252", errors="replace")
+
+
+def write_pdf(path, pages, page_width=595, page_height=842):
+    """
+    Writes a minimal text-only PDF (Helvetica, WinAnsi encoding), one list of lines per
+    page. Enough for pdfplumber's extract_text()/extract_words() and cropping.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    )
+    page_ids = []
+    for lines in pages:
+        stream = b"BT /F1 10 Tf 14 TL 50 %d Td " % (page_height - 80)
+        stream += b" ".join(b"(" + _pdf_text(line) + b") '" for line in lines)
+        stream += b" ET"
+        content = add(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        page_ids.append(
+            add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                % (pages_obj, page_width, page_height, font, content)
+            )
+        )
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        kids,
+        len(page_ids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        catalog,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_mek_pdf(path, n_pages=4, questions_per_page=3, seed=0):
+    write_pdf(
+        path,
+        [
+            mek_page_lines(1 + p * questions_per_page, questions_per_page, seed)
+            for p in range(n_pages)
+        ],
+    )
+
+
+def benchmark_items(n_items=20000, duplicate_rate=0.2, seed=0):
+    """Merged-benchmark-shaped items with a share of exact (prompt, answer) duplicates."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n_items):
+        if items and rng.random() < duplicate_rate:
+            items.append(dict(rng.choice(items)))
+            continue
+        prompt = f"\nORD\n{sentence(rng, 30)}\n\nA: x\nB: y\nC: z\nD: w\n\nSvar:\n"
+        items.append(
+            {
+                "uid": f"synthetic-{i}",
+                "source": "synthetic",
+                "subsection": rng.choice(["ORD", "LAS", "MEK", "XYZ", "KVA", "NOG"]),
+                "prompt": prompt,
+                "answer": rng.choice("ABCD"),
+            }
+        )
+    return items
@@ -0,0 +1,342 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds (in milliseconds) of the latency histogram buckets; the last bucket is open
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RunRecorder:
+    """
+    Cheap always-on recorder for a run: named durations, counters, sampled gauges
+    (e.g. queue depths) and, when a trace file is requested, Chrome trace events
+    (viewable in chrome://tracing or Perfetto).
+    Recording a duration is one perf_counter call and a list append.
+    """
+
+    def __init__(self, trace=False):
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.durations = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.gauges = defaultdict(list)
+        self.trace_events = [] if trace else None
+
+    def record(self, name, seconds, start=None):
+        self.durations[name].append(seconds)
+        if self.trace_events is not None:
+            start = time.perf_counter() - seconds if start is None else start
+            self.trace_events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": seconds * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                }
+            )
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def sample(self, name, value):
+        self.gauges[name].append(value)
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    def timing_stats(self, name):
+        values = sorted(self.durations.get(name, []))
+        histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for seconds in values:
+            histogram[bisect_right(HISTOGRAM_BUCKETS_MS, seconds * 1000)] += 1
+        return {
+            "count": len(values),
+            "total_s": sum(values),
+            "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000 if values else 0.0,
+            "histogram_ms": {
+                "buckets": HISTOGRAM_BUCKETS_MS + ["inf"],
+                "counts": histogram,
+            },
+        }
+
+    def summary(self, **metadata):
+        timings = {name: self.timing_stats(name) for name in sorted(self.durations)}
+        prefill = timings.get("prefill", {}).get("total_s", 0.0)
+        decode = timings.get("decode", {}).get("total_s", 0.0)
+        throughput = {}
+        # The first generated token comes out of the prefill step, so generation
+        # throughput is measured over prefill and decode together
+        for tokens, seconds in [
+            ("prompt_tokens", prefill),
+            ("generated_tokens", prefill + decode),
+        ]:
+            if self.counters.get(tokens) and seconds:
+                throughput[f"{tokens}_per_s"] = self.counters[tokens] / seconds
+        return {
+            **metadata,
+            "started": self.started,
+            "wall_s": time.perf_counter() - self.origin,
+            "counters": dict(self.counters),
+            "gauges": {
+                name: {
+                    "samples": len(values),
+                    "mean": sum(values) / len(values),
+                    "max": max(values),
+                }
+                for name, values in sorted(self.gauges.items())
+            },
+            "throughput": throughput,
+            "timings": timings,
+        }
+
+    def write_summary(self, path, **metadata):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.summary(**metadata), ensure_ascii=False, indent=4))
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events or []}, f)
+
+
+def print_timing_summary(summary):
+    print(
+        f"\n{'Timing':<24} {'count':>7} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}"
+    )
+    for name, t in summary["timings"].items():
+        print(
+            f"{name:<24} {t['count']:>7} {t['total_s']:9.2f} {t['mean_ms']:9.1f} "
+            f"{t['p50_ms']:9.1f} {t['p99_ms']:9.1f}"
+        )
+    for name, value in summary["counters"].items():
+        print(f"{name:<24} {value:>7}")
+    for name, g in summary.get("gauges", {}).items():
+        print(f"{name:<24} {g['samples']:>7} mean {g['mean']:.2f} max {g['max']}")
+    for name, value in summary["throughput"].items():
+        print(f"{name:<24} {value:9.1f}")
+
+
+# Build pipeline profiling.
+# Each pipeline script runs inside pipeline_run(), which writes one JSON profile per run
+# to $SWESAT_PROFILE_DIR (default "profiles"). Setting SWESAT_CPROFILE to a run, stage
+# or function name additionally runs cProfile around it and dumps a .prof file.
+PROFILE_DIR_ENV = "SWESAT_PROFILE_DIR"
+CPROFILE_ENV = "SWESAT_CPROFILE"
+
+_active_profile = None
+
+
+def read_peak_rss_mb():
+    """Peak resident set size of this process, in MB."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def reset_peak_rss():
+    """Resets the kernel's peak RSS counter (Linux only), so a stage reports its own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+class PipelineProfile:
+    def __init__(self, run_name):
+        self.run_name = run_name
+        self.started = time.time()
+        self.stats = {}
+        self.depth = 0
+        self.cprofile_target = os.environ.get(CPROFILE_ENV)
+
+    def add(self, name, wall, cpu, items=None, peak_rss_mb=None):
+        stats = self.stats.setdefault(
+            name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "items": 0}
+        )
+        stats["calls"] += 1
+        stats["wall_s"] += wall
+        stats["cpu_s"] += cpu
+        if items is not None:
+            stats["items"] += items
+        if peak_rss_mb is not None:
+            stats["peak_rss_mb"] = max(stats.get("peak_rss_mb", 0.0), peak_rss_mb)
+
+    def to_dict(self):
+        return {
+            "run": self.run_name,
+            "started": self.started,
+            "pid": os.getpid(),
+            "stages": self.stats,
+        }
+
+
+@contextmanager
+def maybe_cprofile(name, target):
+    if target != name:
+        yield
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profile_dir = os.environ.get(PROFILE_DIR_ENV, "profiles")
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{name}-{int(time.time())}.prof")
+        profiler.dump_stats(path)
+        print(f"\ncProfile of {name} written to {path}; top functions:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+
+@contextmanager
+def stage(name, memory=True):
+    """
+    Times a block as a pipeline stage: wall time, CPU time and, with memory=True, the
+    peak RSS reached during the outermost enclosing stage. The yielded dict can be
+    given an "items" count. Does nothing outside pipeline_run().
+    """
+    profile = _active_profile
+    record = {"items": None}
+    if profile is None:
+        yield record
+        return
+
+    if memory and profile.depth == 0:
+        reset_peak_rss()
+    profile.depth += 1
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        with maybe_cprofile(name, profile.cprofile_target):
+            yield record
+    finally:
+        profile.depth -= 1
+        profile.add(
+            name,
+            time.perf_counter() - wall,
+            time.process_time() - cpu,
+            record["items"],
+            read_peak_rss_mb() if memory else None,
+        )
+
+
+def profiled(name=None, memory=True, count=len):
+    """
+    Decorator that records every call of a function as a stage. count(result) gives the
+    number of items produced (None to skip). Use memory=False for hot per-row functions.
+    """
+
+    def count_items(result):
+        if count is None:
+            return None
+        try:
+            return count(result)
+        except TypeError:
+            return None
+
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profile = _active_profile
+            if profile is None:
+                return fn(*args, **kwargs)
+            if not memory and profile.cprofile_target != label:
+                # Inlined fast path for functions called once per row
+                wall = time.perf_counter()
+                cpu = time.process_time()
+                result = fn(*args, **kwargs)
+                profile.add(
+                    label,
+                    time.perf_counter() - wall,
+                    time.process_time() - cpu,
+                    count_items(result),
+                )
+                return result
+            with stage(label, memory=memory) as record:
+                result = fn(*args, **kwargs)
+                record["items"] = count_items(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def pipeline_run(run_name):
+    """Profiles a whole pipeline script and writes its profile JSON on exit."""
+    global _active_profile
+    previous = _active_profile
+    profile = PipelineProfile(run_name)
+    _active_profile = profile
+    try:
+        with stage(run_name):
+            yield profile
+    finally:
+        _active_profile = previous
+        write_profile(profile)
+
+
+def write_profile(profile):
+    profile_dir = os.environ.get(PROFILE_DIR_ENV, "profiles")
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(
+        profile_dir, f"{profile.run_name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(profile.to_dict(), ensure_ascii=False, indent=4))
+
+    print(
+        f"\n{'Stage':<32} {'calls':>7} {'wall s':>9} {'cpu s':>9} {'items':>8} {'peak MB':>9}"
+    )
+    for name, s in profile.stats.items():
+        peak = s.get("peak_rss_mb")
+        peak = f"{peak:9.1f}" if peak is not None else f"{'-':>9}"
+        print(
+            f"{name:<32} {s['calls']:>7} {s['wall_s']:9.2f} {s['cpu_s']:9.2f} {s['items']:>8} {peak}"
+        )
+    print(f"Profile written to {path}")
+    return path
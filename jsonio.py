@@ -0,0 +1,99 @@
+import io
+import json
+
+# Shared JSON / JSONL I/O. Decoding uses orjson when it is installed; encoding stays on
+# the stdlib encoder, whose output (", " / ": " separators, indent=4) is the format of
+# every file in the repo, so written files are byte-identical with or without orjson.
+# Paths ending in .zst are read and written zstd-compressed (needs `zstandard`).
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Read buffer and write block size (bytes for reads, characters for writes)
+BUFFER_SIZE = 1 << 20
+
+_encoder = json.JSONEncoder(ensure_ascii=False)
+_pretty_encoder = json.JSONEncoder(ensure_ascii=False, indent=4)
+
+
+def loads(data):
+    """Decodes a JSON document given as str or UTF-8 bytes."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity and integers beyond 64 bits are only accepted by the stdlib
+            pass
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Same output as json.dumps(obj, ensure_ascii=False)."""
+    return _encoder.encode(obj)
+
+
+def dumps_pretty(obj):
+    """Same output as json.dumps(obj, ensure_ascii=False, indent=4)."""
+    return _pretty_encoder.encode(obj)
+
+
+def open_file(path, mode="r"):
+    """Opens a text file as UTF-8, transparently (de)compressing .zst files."""
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                f"Reading or writing {path} requires `pip install zstandard`"
+            ) from e
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def read_json(path):
+    with open_file(path, "r") as f:
+        return loads(f.read())
+
+
+def write_json(path, obj, pretty=True):
+    with open_file(path, "w") as f:
+        f.write(dumps_pretty(obj) if pretty else dumps(obj))
+
+
+def iter_jsonl(path):
+    """Streams the objects of a JSONL file, skipping blank lines."""
+    if path.endswith(".zst"):
+        with open_file(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+        return
+    # Bytes lines skip the UTF-8 decode step; both decoders accept them directly
+    with open(path, "rb", buffering=BUFFER_SIZE) as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def read_jsonl(path):
+    return list(iter_jsonl(path))
+
+
+def write_jsonl(path, rows):
+    """Writes one object per line; rows with a to_dict() method are converted first."""
+    count = 0
+    with open_file(path, "w") as f:
+        buffer = io.StringIO()
+        for row in rows:
+            if hasattr(row, "to_dict"):
+                row = row.to_dict()
+            buffer.write(_encoder.encode(row))
+            buffer.write("\n")
+            count += 1
+            if buffer.tell() >= BUFFER_SIZE:
+                f.write(buffer.getvalue())
+                buffer = io.StringIO()
+        f.write(buffer.getvalue())
+    return count
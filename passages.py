@@ -0,0 +1,68 @@
+import hashlib
+import os
+import jsonio
+
+# Reading passages (LÄS) are stored once per exam date / merged file in a passages table,
+# and questions reference them by "passage_id". The full prompt, passage first so that
+# all questions of a passage share a prefix, is only materialized when items are read.
+
+
+def passage_id(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def passages_path(path):
+    """Companion passages table of a JSONL/JSON file or of an exam directory."""
+    if os.path.isdir(path):
+        return os.path.join(path, "passages.json")
+    path = path[: -len(".zst")] if path.endswith(".zst") else path
+    return os.path.splitext(path)[0] + ".passages.json"
+
+
+def load_passages(path):
+    if not os.path.exists(path):
+        return {}
+    return jsonio.read_json(path)
+
+
+def save_passages(passages, path):
+    jsonio.write_json(path, dict(sorted(passages.items())))
+
+
+def intern_passages(items, passages=None):
+    """
+    Moves inline "passage" texts into a table keyed by content hash, replacing them with
+    a "passage_id" on each item. Returns (items, passages).
+    """
+    passages = {} if passages is None else passages
+    interned = []
+    for item in items:
+        if item.get("passage"):
+            item = dict(item)
+            text = item.pop("passage")
+            item["passage_id"] = passage_id(text)
+            passages[item["passage_id"]] = text
+        interned.append(item)
+    return interned, passages
+
+
+def materialize(item, passages, table_path=None):
+    """
+    The item with its passage prepended to the prompt, as presented to a model.
+    table_path names the passages table in the error raised when the passage is missing.
+    """
+    pid = item.get("passage_id")
+    if not pid:
+        return item
+    if pid not in passages:
+        if table_path and not os.path.exists(table_path):
+            problem = f"the passages table {table_path} does not exist"
+        else:
+            problem = f"it is missing from {table_path or 'the passages table'}, which is out of date"
+        raise ValueError(
+            f"Passage {pid} of item {item.get('uid', '')} cannot be loaded: {problem}."
+        )
+    prompt = f"{passages[pid]}\n{item['prompt']}"
+    if isinstance(item, dict):
+        return {**item, "prompt": prompt}
+    return item.replace(prompt=prompt)
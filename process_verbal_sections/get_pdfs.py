@@ -1,5 +1,7 @@
+import argparse
 from pathlib import Path
 import requests
+from instrumentation import pipeline_run, stage
 
 pdf_paths = {
     "2020-10-25": {
@@ -36,7 +38,8 @@ pdf_paths = {
     },
 }
 
-if __name__ == "__main__":
+
+def download_pdfs():
     Path("exam_pdfs").mkdir(parents=True, exist_ok=True)
     for datestamp in pdf_paths.keys():
         for pdf_filename in pdf_paths[datestamp].keys():
@@ -45,8 +48,23 @@ if __name__ == "__main__":
             print(url)
             Path(f"exam_pdfs/{datestamp}").mkdir(parents=True, exist_ok=True)
             filename = Path(f"exam_pdfs/{datestamp}/{pdf_filename}")
-            response = requests.get(url)
+            with stage("download_pdf", memory=False) as record:
+                response = requests.get(url)
+                record["items"] = 1
             print(f"Writing... {filename}")
             filename.write_bytes(response.content)
             print("Done!")
             print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Download the verbal SweSAT exam PDFs into exam_pdfs/"
+    )
+    parser.parse_args(argv)
+    download_pdfs()
+
+
+if __name__ == "__main__":
+    with pipeline_run("get_pdfs"):
+        main()
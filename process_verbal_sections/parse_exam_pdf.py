@@ -1,9 +1,11 @@
+import argparse
 import glob
-import json
 import os
-import sys
 
 import pdfplumber
+import jsonio
+from instrumentation import pipeline_run, profiled, stage
+from passages import intern_passages, load_passages, passages_path, save_passages
 from verbal_utils import verb_parse_methods
 
 verb_section_keywords = {
@@ -14,6 +16,7 @@ verb_section_keywords = {
 }
 
 
+@profiled(count=lambda pages: sum(len(p) for p in pages.values()))
 def identify_section_pages(pdf_path, section_keywords):
     section_pages = {k: [] for k in section_keywords}
 
@@ -41,16 +44,14 @@ def identify_section_pages(pdf_path, section_keywords):
     return section_pages
 
 
-# Execute the main function
-if __name__ == "__main__":
-    exam_pdfs_path = sys.argv[1]
+def parse_exam_pdfs(exam_pdfs_path):
     pdf_files = sorted(glob.glob(f"{exam_pdfs_path}/*/*.pdf"))
     for pdf_path in pdf_files:
         output_path = pdf_path.replace("exam_pdfs", "exams").replace(".pdf", ".json")
         os.makedirs("/".join(output_path.split("/")[:-1]), exist_ok=True)
         if "verb" in pdf_path:
             # load the existing ORD questions & dismiss the rest
-            exam = json.load(open(output_path, "r"))
+            exam = jsonio.read_json(output_path)
             exam = [q for q in exam if q["question_type"] == "ORD"]
 
             section_pages = identify_section_pages(pdf_path, verb_section_keywords)
@@ -61,7 +62,27 @@ if __name__ == "__main__":
                 if not questions:
                     continue
                 exam.extend(questions)
-            with open(output_path, "w") as f:
-                f.write(json.dumps(exam, ensure_ascii=False, indent=4))
+            with stage("write_exam_json") as record:
+                # LÄS passages go to the date's passages table, referenced by hash
+                table_path = passages_path(os.path.dirname(output_path))
+                exam, passages = intern_passages(exam, load_passages(table_path))
+                save_passages(passages, table_path)
+                jsonio.write_json(output_path, exam)
+                record["items"] = len(exam)
         else:  # if facit or kvant in the pdf_path
             continue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Parse the verbal sections of the downloaded exam PDFs into exams/"
+    )
+    parser.add_argument("exam_pdfs_path", nargs="?", default="exam_pdfs")
+    args = parser.parse_args(argv)
+    parse_exam_pdfs(args.exam_pdfs_path)
+
+
+# Execute the main function
+if __name__ == "__main__":
+    with pipeline_run("parse_exam_pdf"):
+        main()
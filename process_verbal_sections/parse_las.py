@@ -1,5 +1,6 @@
 import json
 import re
+from instrumentation import profiled
 
 
 def postprocess(text):
@@ -89,6 +90,7 @@ def extract_text_from_columns(
     return merged
 
 
+@profiled()
 def find_uppgifter_and_extract(reader, pages):
     """Process PDF, find 'uppgifter', and extract passages and questions."""
     extracted_data = []
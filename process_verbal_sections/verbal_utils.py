@@ -1,4 +1,5 @@
 import re
+from instrumentation import profiled
 from parse_las import find_uppgifter_and_extract
 
 
@@ -10,6 +11,7 @@ def extract_text_from_pages(pages, pdf):
     return text
 
 
+@profiled()
 def parse_ord(reader, pages):
     # Extract and clean the text
     full_text = "\n".join(
@@ -84,6 +86,7 @@ def parse_las(reader, pages):
     return extracted_questions
 
 
+@profiled()
 def parse_mek(reader, pages):
     question_list = []
 
@@ -0,0 +1,106 @@
+import functools
+from prompts import full_prompts, zero_shot_prompts
+
+# Compiled prompt templates. A SweSAT prompt depends only on its subsection, the
+# letters of its options and the instruction variant, so each combination is compiled
+# once into a single format string and items are rendered with one format() call.
+# Rendered prompts are byte-identical to the ones the merge has always produced.
+PROMPT_VARIANTS = {"zero_shot": zero_shot_prompts, "full": full_prompts}
+DEFAULT_VARIANT = "zero_shot"
+LETTERS = ["A", "B", "C", "D", "E"]
+
+
+def escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def option_lines(letters, texts):
+    """Options listed one per line as "A: text", the form every source uses."""
+    return "".join(f"{letter}: {text}\n" for letter, text in zip(letters, texts))
+
+
+@functools.lru_cache(maxsize=None)
+def system_prompt(options_count):
+    if options_count == 0:
+        return ""
+    letters = LETTERS[:options_count]
+    prompt = "Du är en expert på att skriva högskoleprovet.\n\n"
+    for letter in letters:
+        prompt += f"- Om det rätta svaret är svarsalternativ {letter}, skriv bara ut {letter}\n"
+    if len(letters) > 1:
+        prompt += f"- Skriv bara ut {', '.join(letters[:-1])} eller {letters[-1]} - inget annat\n"
+    elif len(letters) == 1:
+        prompt += f"- Skriv bara ut {letters[0]} - inget annat\n"
+    return prompt
+
+
+@functools.lru_cache(maxsize=None)
+def example_template(letters):
+    """Format string of one solved demonstration: question, option texts, answer."""
+    options = "".join(f"{letter}: {{}}\n" for letter in letters)
+    return "Exempel:\n{}\n\n" + options + "Rätt svar:{}\n\n"
+
+
+class PromptTemplate:
+    """The prompt of one (subsection, option letters, variant) combination."""
+
+    def __init__(self, subsection, letters, variant=DEFAULT_VARIANT):
+        self.letters = letters
+        head = f"\n{subsection}\n"
+        instruction = PROMPT_VARIANTS[variant].get(subsection, "")
+        if instruction:
+            head += f"{instruction}\n\n"
+        self.head = head
+        self.body = (
+            "{}\n\n" + "".join(f"{letter}: {{}}\n" for letter in letters) + "\nSvar:\n"
+        )
+        self.fmt = escape(head) + self.body
+
+    def render(self, question, texts, examples=()):
+        """
+        Renders the prompt for a question and the texts of its options (in the order of
+        self.letters). Examples are (question, {letter: text}, answer) demonstrations.
+        """
+        if not examples:
+            return self.fmt.format(question, *texts)
+        demos = []
+        for example_question, example_options, example_answer in examples:
+            example_letters = tuple(k for k, v in example_options.items() if v)
+            demos.append(
+                example_template(example_letters).format(
+                    example_question,
+                    *(example_options[k] for k in example_letters),
+                    example_answer,
+                )
+            )
+        return self.head + "".join(demos) + self.body.format(question, *texts)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(subsection, letters, variant=DEFAULT_VARIANT):
+    return PromptTemplate(subsection, tuple(letters), variant)
+
+
+def rerender(item, variant=DEFAULT_VARIANT):
+    """
+    A SweSAT item with its prompt rendered under another instruction variant, from the
+    fields the item already carries, so the source exams are not read again. Items of
+    other sources, and prompts no variant renders (such as few-shot prompts with
+    demonstrations), are returned as is.
+    """
+    if item.get("source") != "swesat":
+        return item
+    options = {letter: item.get(f"option_{letter.lower()}") or "" for letter in LETTERS}
+    letters = tuple(k for k, v in options.items() if v)
+    texts = [options[k] for k in letters]
+    subsection = item.get("subsection", "")
+    question = item.get("question", "")
+    known = {
+        get_template(subsection, letters, name).render(question, texts)
+        for name in PROMPT_VARIANTS
+    }
+    if item.get("prompt") not in known:
+        return item
+    return item.replace(
+        prompt=get_template(subsection, letters, variant).render(question, texts)
+    )
@@ -0,0 +1,109 @@
+import json
+import math
+import random
+
+
+def wilson_interval(correct, n, z=1.96):
+    """Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    p = correct / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def stopping_reason(correct, n, target_width, min_items, baseline=None, z=1.96):
+    """
+    Returns why a subsection can stop being evaluated, or None to keep drawing items.
+    A subsection stops once its interval is narrower than target_width, or once a
+    baseline accuracy falls outside the interval (the comparison is decided).
+    """
+    if n < min_items:
+        return None
+    low, high = wilson_interval(correct, n, z)
+    if high - low <= target_width:
+        return "precise"
+    if baseline is not None and baseline < low:
+        return "above baseline"
+    if baseline is not None and baseline > high:
+        return "below baseline"
+    return None
+
+
+def adaptive_evaluate(
+    strata,
+    score_item,
+    target_width=0.2,
+    min_items=10,
+    baselines=None,
+    z=1.96,
+    seed=42,
+):
+    """
+    Evaluates each stratum on its items in a seeded random order, scoring one item at a
+    time with score_item(item) -> bool, until stopping_reason() says the accuracy is
+    pinned down or the stratum runs out of items.
+
+    Note that checking the interval after every item makes the effective confidence
+    level lower than the nominal one; raise z for stricter sequential guarantees.
+    """
+    baselines = baselines or {}
+    report = {}
+
+    for key, items in strata.items():
+        order = list(items)
+        random.Random(f"{seed}-{key[0]}-{key[1]}").shuffle(order)
+        baseline = baselines.get(key)
+
+        correct = 0
+        n = 0
+        reason = "exhausted"
+        for item in order:
+            correct += bool(score_item(item))
+            n += 1
+            stop = stopping_reason(correct, n, target_width, min_items, baseline, z)
+            if stop:
+                reason = stop
+                break
+
+        low, high = wilson_interval(correct, n, z)
+        report[key] = {
+            "source": key[0],
+            "subsection": key[1],
+            "items_spent": n,
+            "items_available": len(items),
+            "correct": correct,
+            "accuracy": correct / n if n else 0.0,
+            "ci_low": low,
+            "ci_high": high,
+            "baseline": baseline,
+            "stopped": reason,
+        }
+
+    return report
+
+
+def print_adaptive_report(report):
+    spent = sum(r["items_spent"] for r in report.values())
+    available = sum(r["items_available"] for r in report.values())
+    print(f"\n{'source/subsection':<40} {'items':>11} {'acc':>7} {'95% CI':>17}  stopped")
+    for r in report.values():
+        name = f"{r['source']}/{r['subsection']}"
+        items = f"{r['items_spent']}/{r['items_available']}"
+        ci = f"[{r['ci_low'] * 100:5.1f}, {r['ci_high'] * 100:5.1f}]"
+        print(f"{name:<40} {items:>11} {r['accuracy'] * 100:6.1f}% {ci:>17}  {r['stopped']}")
+    print(f"\nItems spent: {spent} of {available} available.")
+
+
+def save_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(list(report.values()), ensure_ascii=False, indent=4))
+
+
+def load_baselines(path):
+    """Loads per-stratum accuracies from a report written by save_report()."""
+    with open(path, "r", encoding="utf-8") as f:
+        rows = json.load(f)
+    return {(r["source"], r["subsection"]): r["accuracy"] for r in rows}
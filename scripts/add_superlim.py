@@ -1,8 +1,30 @@
-import json
+import argparse
+import functools
 import os
-from datasets import load_dataset, get_dataset_config_names
+import string
+import time
+import jsonio
+from concurrent.futures import ThreadPoolExecutor
+from benchmark_item import FIELDS, OPTIONAL_FIELDS, BenchmarkItem
+from instrumentation import pipeline_run, profiled, stage
+from prompt_templates import option_lines
+from snapshots import init_progress_lock, load_snapshot, snapshot_config_names
 
+# The superlim-2 configs are independent, so they are loaded from a thread pool
+LOAD_WORKERS = 8
+# Rows inspected per config to decide whether its schema is broken
+SCHEMA_SAMPLE_SIZE = 20
 
+
+def looks_like_json_object(value):
+    return (
+        isinstance(value, str)
+        and value.strip().startswith("{")
+        and value.strip().endswith("}")
+    )
+
+
+@profiled(memory=False, count=None)
 def fix_row(row):
     """
     Some SuperLim-2 JSONL files were incorrectly uploaded to HF Hub as TSV,
@@ -10,198 +32,342 @@ def fix_row(row):
     This function parses the string if it's a valid JSON object.
     """
     for k, v in row.items():
-        if isinstance(v, str) and v.strip().startswith("{") and v.strip().endswith("}"):
+        if looks_like_json_object(v):
             try:
-                parsed = json.loads(v)
+                parsed = jsonio.loads(v)
                 # If it successfully parses as a dict, return it instead.
                 if isinstance(parsed, dict):
                     return parsed
-            except:
+            except ValueError:
                 pass
     return row
 
 
-def map_superlim():
-    configs = get_dataset_config_names("sbx/superlim-2")
-    unified_items = []
+def detect_broken_column(ds, sample_size=SCHEMA_SAMPLE_SIZE):
+    """
+    Looks at the first rows of a config for a column holding whole JSON rows.
+    Returns (column, consistent), where consistent means every sampled row had it.
+    """
+    sample = ds.select(range(min(sample_size, len(ds)))).to_list()
+    for column in ds.column_names:
+        hits = sum(looks_like_json_object(row[column]) for row in sample)
+        if hits:
+            return column, hits == len(sample)
+    return None, False
+
+
+def rows_to_batch(rows):
+    """Row dicts as one columnar batch, in the layout Dataset.map passes to mappers."""
+    # Repaired rows do not all share the first row's keys, so take the union
+    columns = dict.fromkeys(key for row in rows for key in row)
+    return {key: [row.get(key) for row in rows] for key in columns}
+
+
+def repair_schema(ds):
+    """
+    Repairs a config with a broken schema column-wise: the JSON column is decoded in
+    one pass instead of probing every field of every row. Returns (config, mode) where
+    mode describes the repair that was applied. A repaired config is a list of row
+    dicts: its decoded values keep their Python types (an Arrow table would turn a
+    label column of 1 and 4.2 into floats).
+    """
+    column, consistent = detect_broken_column(ds)
+    if column is None:
+        return ds, "ok"
+    if not consistent:
+        # Mixed rows: fall back to probing each row
+        return [fix_row(row) for row in ds], "per-row"
+
+    rows = []
+    for i, value in enumerate(ds[column]):
+        try:
+            parsed = jsonio.loads(value)
+        except (ValueError, TypeError):
+            parsed = None
+        rows.append(parsed if isinstance(parsed, dict) else ds[i])
+    return rows, f"column:{column}"
+
 
-    for conf in configs:
-        print(f"Loading {conf}...")
+def load_config(conf):
+    """Loads one config (train split, falling back to test) and repairs its schema."""
+    start = time.perf_counter()
+    with stage(f"load_dataset:{conf}", memory=False) as record:
         try:
-            ds = load_dataset("sbx/superlim-2", conf, split="train")
+            ds = load_snapshot("sbx/superlim-2", conf, split="train")
         except Exception:
             try:
-                ds = load_dataset("sbx/superlim-2", conf, split="test")
+                ds = load_snapshot("sbx/superlim-2", conf, split="test")
             except Exception:
-                print(f"  -> Skipped {conf}, could not load train or test split.")
+                ds = None
+        record["items"] = len(ds) if ds is not None else 0
+    loaded = time.perf_counter()
+    if ds is None:
+        return conf, None, "missing", {"load_s": loaded - start, "repair_s": 0.0}
+
+    with stage(f"repair_schema:{conf}", memory=False) as record:
+        ds, mode = repair_schema(ds)
+        record["items"] = len(ds)
+    timing = {"load_s": loaded - start, "repair_s": time.perf_counter() - loaded}
+    return conf, ds, mode, timing
+
+
+# Configs with at least this many rows are mapped with MAP_PROCS worker processes
+PARALLEL_MAP_MIN_ROWS = 20000
+MAP_PROCS = os.cpu_count()
+
+LETTERS = ["A", "B", "C", "D", "E"]
+
+# Field order of the benchmark items written to merged_benchmark.jsonl
+ITEM_COLUMNS = [name for name in FIELDS if name not in OPTIONAL_FIELDS]
+
+LABEL_MAP = {
+    "incorrect": "Inkorrekt",
+    "correct": "Korrekt",
+    "entailment": "Entailment",
+    "neutral": "Neutral",
+    "contradiction": "Motsägelse",
+    "coreferring": "Korefererande",
+    "different_sense": "Annan betydelse",
+    "same_sense": "Samma betydelse",
+}
+
+NLI_TASK = {
+    "system_prompt": "Bestäm den logiska relationen mellan de två meningarna.",
+    "template": "Premiss: {premise}\nHypotes: {hypothesis}",
+}
+
+# One declarative mapper per superlim-2 config. "template" placeholders name row
+# columns, or aliases resolved through "fields" (dotted paths reach into nested
+# columns). "options" names a column of candidate answers, listed as A-E after the
+# prompt, with an integer label then mapping to a letter. "label_map" translates
+# string labels and defaults to LABEL_MAP. Configs without an entry are skipped.
+SUPERLIM_TASKS = {
+    "absabank-imm": {
+        "system_prompt": "Bedöm hur positivt eller negativt författaren förhåller sig till invandring på en skala från 1 till 5.",
+        "template": "Text: {text}",
+    },
+    "argumentation-sentences": {
+        "system_prompt": "Bestäm om meningen är för, emot eller orelaterad till ämnet.",
+        "template": "Ämne: {topic}\nMening: {sentence}",
+    },
+    "dalaj-ged-superlim": {
+        "system_prompt": "Bestäm om meningen är språkligt korrekt svenska eller inte.",
+        "template": "Mening: {sentence}",
+    },
+    "sweanalogy": {
+        "system_prompt": "Givet ett ordpar A:B och ett ord C, hitta ett ord D så att A:B = C:D.",
+        "template": "{pair1_element1}:{pair1_element2} = {pair2_element1}:?",
+    },
+    "swediagnostics": NLI_TASK,
+    "swenli": NLI_TASK,
+    "swewinogender": NLI_TASK,
+    "swefaq": {
+        "system_prompt": "Välj det mest passande svaret på frågan bland alternativen.",
+        "template": "Fråga: {question}\n\nAlternativ:\n",
+        "options": "candidate_answers",
+    },
+    "sweparaphrase": {
+        "system_prompt": "Bedöm hur lika de två meningarna är på en kontinuerlig skala.",
+        "template": "Mening 1: {sentence_1}\nMening 2: {sentence_2}",
+    },
+    "swesat-synonyms": {
+        "system_prompt": "Välj rätt synonym till ordet.",
+        "template": "Ord: {item}\n\nAlternativ:\n",
+        "options": "candidate_answers",
+    },
+    "swewic": {
+        "system_prompt": "Bestäm om det angivna ordet har samma betydelse i båda kontexterna.",
+        "template": "Ord 1: {w1} i kontext: {c1}\nOrd 2: {w2} i kontext: {c2}",
+        "fields": {
+            "w1": "first.word.text",
+            "c1": "first.context",
+            "w2": "second.word.text",
+            "c2": "second.context",
+        },
+    },
+    "swewinograd": {
+        "system_prompt": "Bestäm om pronomenet syftar på kandidaten i texten.",
+        "template": "Text: {text}\nPronomen: {pronoun}\nKandidat: {candidate}",
+        "fields": {
+            "pronoun": "pronoun.text",
+            "candidate": "candidate_antecedent.text",
+        },
+    },
+}
+
+
+def compile_template(task):
+    """Splits a task template into a positional format string and its field paths."""
+    fields = task.get("fields", {})
+    parts = []
+    paths = []
+    for literal, name, _, _ in string.Formatter().parse(task["template"]):
+        parts.append(literal)
+        if name is not None:
+            parts.append("{}")
+            paths.append(fields.get(name, name).split("."))
+    return "".join(parts), paths
+
+
+@functools.lru_cache(maxsize=None)
+def task_template(conf):
+    """compile_template of a config's registry entry, compiled once per process."""
+    return compile_template(SUPERLIM_TASKS[conf])
+
+
+def column_values(batch, path, n):
+    """Values at a dotted path for a batch of rows; missing or null values become ""."""
+    values = batch.get(path[0]) or [None] * n
+    for key in path[1:]:
+        values = [v.get(key) if isinstance(v, dict) else None for v in values]
+    return ["" if v is None else v for v in values]
+
+
+def map_task_batch(batch, indices, conf):
+    task = SUPERLIM_TASKS[conf]
+    fmt, paths = task_template(conf)
+    n = len(indices)
+    columns = [column_values(batch, path, n) for path in paths]
+    prompts = [fmt.format(*values) for values in zip(*columns)]
+
+    label_map = task.get("label_map", LABEL_MAP)
+    labels = batch.get("label") or [None] * n
+    answers = ["" if label is None else str(label) for label in labels]
+    answers = [label_map.get(answer, answer) for answer in answers]
+
+    options = [[""] * 5 for _ in range(n)]
+    if "options" in task:
+        for j, cands in enumerate(batch.get(task["options"]) or [None] * n):
+            if not isinstance(cands, list):
                 continue
+            for idx, cand in enumerate(cands[:5]):
+                options[j][idx] = str(cand)
+            prompts[j] += option_lines(LETTERS, cands[:5])
+        answers = [
+            (
+                LETTERS[label]
+                if isinstance(label, int) and 0 <= label < len(LETTERS)
+                else answer
+            )
+            for label, answer in zip(labels, answers)
+        ]
+
+    prompts = [prompt + "\n\nSvar:" for prompt in prompts]
+    return {
+        "uid": [f"superlim2-{conf}-{i}" for i in indices],
+        "test_id": [f"superlim2-{conf}"] * n,
+        "section": [conf] * n,
+        "subsection": [conf] * n,
+        "question_id": list(indices),
+        "question_resource": [None] * n,
+        "question": prompts,
+        "option_a": [o[0] for o in options],
+        "option_b": [o[1] for o in options],
+        "option_c": [o[2] for o in options],
+        "option_d": [o[3] for o in options],
+        "option_e": [o[4] for o in options],
+        "system_prompt": [task["system_prompt"]] * n,
+        "prompt": prompts,
+        "answer": answers,
+        "source": ["superlim-2"] * n,
+    }
+
 
-        count = 0
-        for i, row in enumerate(ds):
-            # Parse broken schemas
-            row = fix_row(row)
-
-            LABEL_MAP = {
-                "incorrect": "Inkorrekt",
-                "correct": "Korrekt",
-                "entailment": "Entailment",
-                "neutral": "Neutral",
-                "contradiction": "Motsägelse",
-                "coreferring": "Korefererande",
-                "different_sense": "Annan betydelse",
-                "same_sense": "Samma betydelse",
-            }
-
-            prompt = ""
-            sys_prompt = ""
-            # Safely get label, handle list or dict if malformed, default string
-            answer_raw = row.get("label", "")
-            ans_str = str(answer_raw) if answer_raw is not None else ""
-            answer = LABEL_MAP.get(ans_str, ans_str)
-            options = ["", "", "", "", ""]
-
-            if conf == "absabank-imm":
-                sys_prompt = "Bedöm hur positivt eller negativt författaren förhåller sig till invandring på en skala från 1 till 5."
-                prompt = f"Text: {row.get('text', '')}"
-
-            elif conf == "argumentation-sentences":
-                sys_prompt = (
-                    "Bestäm om meningen är för, emot eller orelaterad till ämnet."
-                )
-                prompt = (
-                    f"Ämne: {row.get('topic', '')}\nMening: {row.get('sentence', '')}"
-                )
-
-            elif conf == "dalaj-ged-superlim":
-                sys_prompt = (
-                    "Bestäm om meningen är språkligt korrekt svenska eller inte."
-                )
-                prompt = f"Mening: {row.get('sentence', '')}"
-
-            elif conf == "sweanalogy":
-                sys_prompt = "Givet ett ordpar A:B och ett ord C, hitta ett ord D så att A:B = C:D."
-                prompt = f"{row.get('pair1_element1', '')}:{row.get('pair1_element2', '')} = {row.get('pair2_element1', '')}:?"
-
-            elif conf in ["swediagnostics", "swenli", "swewinogender"]:
-                sys_prompt = "Bestäm den logiska relationen mellan de två meningarna."
-                prompt = f"Premiss: {row.get('premise', '')}\nHypotes: {row.get('hypothesis', '')}"
-
-            elif conf == "swefaq":
-                sys_prompt = (
-                    "Välj det mest passande svaret på frågan bland alternativen."
-                )
-                q = row.get("question", "")
-                cands = row.get("candidate_answers", [])
-                if not isinstance(cands, list):
-                    cands = []
-                prompt = f"Fråga: {q}\n\nAlternativ:\n"
-                letters = ["A", "B", "C", "D", "E"]
-                for idx, cand in enumerate(cands[:5]):
-                    prompt += f"{letters[idx]}: {cand}\n"
-                    options[idx] = str(cand)
-
-                ans_idx = row.get("label")
-                if (
-                    ans_idx is not None
-                    and isinstance(ans_idx, int)
-                    and 0 <= ans_idx < len(letters)
-                ):
-                    answer = letters[ans_idx]
-
-            elif conf == "sweparaphrase":
-                sys_prompt = (
-                    "Bedöm hur lika de två meningarna är på en kontinuerlig skala."
-                )
-                prompt = f"Mening 1: {row.get('sentence_1', '')}\nMening 2: {row.get('sentence_2', '')}"
-
-            elif conf == "swesat-synonyms":
-                sys_prompt = "Välj rätt synonym till ordet."
-                prompt = f"Ord: {row.get('item', '')}\n\nAlternativ:\n"
-                cands = row.get("candidate_answers", [])
-                if not isinstance(cands, list):
-                    cands = []
-                letters = ["A", "B", "C", "D", "E"]
-                for idx, cand in enumerate(cands[:5]):
-                    prompt += f"{letters[idx]}: {cand}\n"
-                    options[idx] = str(cand)
-
-                ans_idx = row.get("label")
-                if (
-                    ans_idx is not None
-                    and isinstance(ans_idx, int)
-                    and 0 <= ans_idx < len(letters)
-                ):
-                    answer = letters[ans_idx]
-
-            elif conf == "swewic":
-                sys_prompt = "Bestäm om det angivna ordet har samma betydelse i båda kontexterna."
-                first = row.get("first", {}) or {}
-                second = row.get("second", {}) or {}
-                w1 = first.get("word", {}).get("text", "")
-                c1 = first.get("context", "")
-                w2 = second.get("word", {}).get("text", "")
-                c2 = second.get("context", "")
-                prompt = f"Ord 1: {w1} i kontext: {c1}\nOrd 2: {w2} i kontext: {c2}"
-
-            elif conf == "swewinograd":
-                sys_prompt = "Bestäm om pronomenet syftar på kandidaten i texten."
-                prompt = f"Text: {row.get('text', '')}\nPronomen: {row.get('pronoun', {}).get('text', '')}\nKandidat: {row.get('candidate_antecedent', {}).get('text', '')}"
-            else:
-                # If we don't have a mapping for it, skip.
+def map_task(ds, conf):
+    """Maps a whole config to benchmark items with its registry entry, column-wise."""
+    # Outputs named like an input column (e.g. "question") keep that column's position,
+    # so the item field order is restored explicitly
+    mapped = ds.map(
+        map_task_batch,
+        batched=True,
+        with_indices=True,
+        fn_kwargs={"conf": conf},
+        remove_columns=ds.column_names,
+        num_proc=MAP_PROCS if len(ds) >= PARALLEL_MAP_MIN_ROWS else None,
+        desc=f"Mapping {conf}",
+    )
+    return mapped.select_columns(ITEM_COLUMNS).to_list()
+
+
+def map_rows(rows, conf):
+    """map_task for a repaired config: its row dicts are mapped as a single batch."""
+    mapped = map_task_batch(rows_to_batch(rows), range(len(rows)), conf)
+    columns = [mapped[name] for name in ITEM_COLUMNS]
+    return [dict(zip(ITEM_COLUMNS, values)) for values in zip(*columns)]
+
+
+def config_items(ds, conf):
+    with stage(f"map_task:{conf}") as record:
+        rows = map_rows(ds, conf) if isinstance(ds, list) else map_task(ds, conf)
+        items = [BenchmarkItem.from_dict(row) for row in rows]
+        record["items"] = len(items)
+    return items
+
+
+def print_config_timings(report):
+    print(f"\n{'Config':<28} {'rows':>7} {'load s':>8} {'repair s':>9}  schema")
+    for conf, n_rows, mode, timing in report:
+        print(
+            f"{conf:<28} {n_rows:>7} {timing['load_s']:8.2f} {timing['repair_s']:9.2f}  {mode}"
+        )
+
+
+def map_superlim(workers=LOAD_WORKERS, output_file="merged_benchmark.jsonl"):
+    with stage("get_config_names") as record:
+        configs = snapshot_config_names("sbx/superlim-2")
+        record["items"] = len(configs)
+    unified_items = []
+    report = []
+
+    unmapped = [conf for conf in configs if conf not in SUPERLIM_TASKS]
+    if unmapped:
+        print(f"No task mapper for {', '.join(unmapped)}; skipping.")
+    configs = [conf for conf in configs if conf in SUPERLIM_TASKS]
+
+    print(f"Loading {len(configs)} configs with {workers} workers...")
+    init_progress_lock()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map() yields in config order, so the output order does not depend on timing
+        for conf, ds, mode, timing in pool.map(load_config, configs):
+            report.append((conf, len(ds) if ds is not None else 0, mode, timing))
+            if ds is None:
+                print(f"  -> Skipped {conf}, could not load train or test split.")
                 continue
 
-            prompt += "\n\nSvar:"
-
-            unified_items.append(
-                {
-                    "uid": f"superlim2-{conf}-{i}",
-                    "test_id": f"superlim2-{conf}",
-                    "section": conf,
-                    "subsection": conf,
-                    "question_id": i,
-                    "question_resource": None,
-                    "question": prompt,
-                    "option_a": options[0],
-                    "option_b": options[1],
-                    "option_c": options[2],
-                    "option_d": options[3],
-                    "option_e": options[4],
-                    "system_prompt": sys_prompt,
-                    "prompt": prompt,
-                    "answer": answer,
-                    "source": "superlim-2",
-                }
-            )
-            count += 1
+            items = config_items(ds, conf)
+            unified_items.extend(items)
+            print(f"  -> Processed {len(items)} items for {conf}.")
 
-        print(f"  -> Processed {count} items for {conf}.")
+    print_config_timings(report)
 
     print(f"\nSuccessfully mapped {len(unified_items)} total items from superlim-2.")
 
-    output_file = "merged_benchmark.jsonl"
     if os.path.exists(output_file):
         seen = set()
         existing_items = []
-        with open(output_file, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                item = json.loads(line)
-                sig = (item.get("prompt", ""), item.get("answer", ""))
-                seen.add(sig)
-                existing_items.append(item)
+        for row in jsonio.iter_jsonl(output_file):
+            item = BenchmarkItem.from_dict(row)
+            sig = (
+                item.get("prompt", ""),
+                item.get("answer", ""),
+                item.get("passage_id"),
+            )
+            seen.add(sig)
+            existing_items.append(item)
 
         added = 0
         for item in unified_items:
-            sig = (item.get("prompt", ""), item.get("answer", ""))
+            sig = (
+                item.get("prompt", ""),
+                item.get("answer", ""),
+                item.get("passage_id"),
+            )
             if sig not in seen:
                 seen.add(sig)
                 existing_items.append(item)
                 added += 1
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            for item in existing_items:
-                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        jsonio.write_jsonl(output_file, existing_items)
 
         print(
             f"Added {added} unique items. Skipped {len(unified_items) - added} duplicates."
@@ -211,5 +377,21 @@ def map_superlim():
         print(f"{output_file} not found. Could not append to it.")
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Append the SuperLim-2 tasks to the merged benchmark"
+    )
+    parser.add_argument("--output", type=str, default="merged_benchmark.jsonl")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=LOAD_WORKERS,
+        help="Threads used to load SuperLim configs",
+    )
+    args = parser.parse_args(argv)
+    map_superlim(args.workers, args.output)
+
+
 if __name__ == "__main__":
-    map_superlim()
+    with pipeline_run("add_superlim"):
+        main()
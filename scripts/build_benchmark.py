@@ -0,0 +1,288 @@
+import argparse
+import hashlib
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+import add_superlim
+import benchmark_item
+import exam_repository
+import jsonio
+import merge_benchmarks
+import passages
+import prompt_templates
+import prompts
+from benchmark_item import BenchmarkItem
+from exam_repository import get_repository
+from instrumentation import pipeline_run, stage
+from passages import passages_path, save_passages
+from snapshots import init_progress_lock, load_manifest, snapshot_config_names
+
+# Incremental build of merged_benchmark.jsonl. Every source unit (an exam file, the
+# Skolprov split, a SuperLim config) is a node whose key hashes its input data and the
+# code that maps it; node outputs are cached as JSONL, so a rebuild only recomputes the
+# nodes whose key changed and then re-runs dedup over the cached pieces.
+BUILD_DIR = os.environ.get("SWESAT_BUILD_DIR", os.path.join(".cache", "build"))
+OUTPUT_FILE = "merged_benchmark.jsonl"
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def file_bytes(path):
+    if not os.path.exists(path):
+        return b""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def source_of(*objects):
+    return "".join(inspect.getsource(obj) for obj in objects)
+
+
+def mapping_recipe():
+    """
+    Source of the modules that map source data to benchmark items. Whole modules are
+    hashed, so every helper a mapper calls is part of the node keys.
+    """
+    return source_of(
+        merge_benchmarks,
+        add_superlim,
+        exam_repository,
+        passages,
+        prompt_templates,
+        prompts,
+        benchmark_item,
+    )
+
+
+def snapshot_checksum(repo_id, config):
+    """The snapshot's content hash, or None if the config is read from the Hub."""
+    entry = load_manifest().get(repo_id, {}).get("configs", {}).get(config)
+    return entry["sha256"] if entry else None
+
+
+def swesat_nodes(shots=0, variant=prompt_templates.DEFAULT_VARIANT):
+    recipe = digest(mapping_recipe(), variant)
+    by_file = {}
+    for question in get_repository():
+        by_file.setdefault(question["source_file"], []).append(question)
+    if shots:
+        import few_shot
+
+        # Demonstrations may come from any exam, so every file is an input of every node
+        recipe = digest(
+            recipe,
+            shots,
+            source_of(few_shot),
+            *(file_bytes(path) for path in sorted(by_file)),
+        )
+
+    nodes = []
+    for path, questions in sorted(by_file.items()):
+        exam_dir = os.path.dirname(path)
+        # The answers come from the date's facit and passages from its passages table
+        shared = [
+            os.path.join(exam_dir, name)
+            for name in sorted(os.listdir(exam_dir))
+            if "facit" in name.lower() or name == "passages.json"
+        ]
+        nodes.append(
+            {
+                "name": "swesat/" + os.path.splitext(os.path.relpath(path, "exams"))[0],
+                "key": digest(recipe, file_bytes(path), *map(file_bytes, shared)),
+                "build": lambda questions=questions: merge_benchmarks.swesat_items(
+                    questions, shots, variant
+                ),
+            }
+        )
+    return nodes
+
+
+def skolprov_nodes():
+    checksum = snapshot_checksum("Ekgren/swedish_skolprov", "all")
+    recipe = mapping_recipe()
+    return [
+        {
+            "name": "skolprov/all",
+            "key": digest(recipe, checksum) if checksum else None,
+            "build": merge_benchmarks.load_skolprov,
+        }
+    ]
+
+
+def superlim_nodes():
+    recipe = mapping_recipe()
+    nodes = []
+    for conf in snapshot_config_names("sbx/superlim-2"):
+        if conf not in add_superlim.SUPERLIM_TASKS:
+            continue
+        checksum = snapshot_checksum("sbx/superlim-2", conf)
+        key = digest(recipe, checksum) if checksum else None
+        nodes.append({"name": f"superlim/{conf}", "key": key, "config": conf})
+    return nodes
+
+
+def node_output(node):
+    return os.path.join(BUILD_DIR, "nodes", node["name"] + ".jsonl")
+
+
+def state_path():
+    return os.path.join(BUILD_DIR, "state.json")
+
+
+def load_state():
+    if not os.path.exists(state_path()):
+        return {"nodes": {}, "output": None}
+    return jsonio.read_json(state_path())
+
+
+def output_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_fresh(node, state):
+    return (
+        node["key"] is not None
+        and state["nodes"].get(node["name"], {}).get("key") == node["key"]
+        and os.path.exists(node_output(node))
+    )
+
+
+def build_superlim(nodes, workers):
+    """Loads the dirty SuperLim configs concurrently, then maps them one by one."""
+    outputs = {}
+    init_progress_lock()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        confs = [node["config"] for node in nodes]
+        for node, (conf, ds, _, _) in zip(
+            nodes, pool.map(add_superlim.load_config, confs)
+        ):
+            if ds is None:
+                print(f"  -> Skipped {conf}, could not load train or test split.")
+                outputs[node["name"]] = []
+                continue
+            outputs[node["name"]] = add_superlim.config_items(ds, conf)
+    return outputs
+
+
+def build(
+    output_file=OUTPUT_FILE,
+    force=False,
+    workers=add_superlim.LOAD_WORKERS,
+    shots=0,
+    variant=prompt_templates.DEFAULT_VARIANT,
+):
+    with stage("plan") as record:
+        state = load_state()
+        nodes = swesat_nodes(shots, variant) + skolprov_nodes() + superlim_nodes()
+        dirty = [node for node in nodes if force or not is_fresh(node, state)]
+        keys = [node["key"] for node in nodes]
+        output_key = (
+            digest(*(f"{node['name']}={node['key']}" for node in nodes))
+            if None not in keys
+            else None
+        )
+        record["items"] = len(nodes)
+
+    up_to_date = (
+        not dirty
+        and output_key is not None
+        and state["output"]
+        and state["output"]["key"] == output_key
+        and os.path.exists(output_file)
+        and state["output"]["stamp"] == output_stamp(output_file)
+    )
+    if up_to_date:
+        print(f"{output_file} is up to date ({len(nodes)} nodes).")
+        return
+
+    print(f"Rebuilding {len(dirty)} of {len(nodes)} nodes...")
+    outputs = {}
+    with stage("build_nodes") as record:
+        superlim = [node for node in dirty if "config" in node]
+        outputs.update(build_superlim(superlim, workers))
+        for node in dirty:
+            if "config" not in node:
+                outputs[node["name"]] = node["build"]()
+        for node in dirty:
+            print(f"  {node['name']}: {len(outputs[node['name']])} items")
+            os.makedirs(os.path.dirname(node_output(node)), exist_ok=True)
+            count = jsonio.write_jsonl(node_output(node), outputs[node["name"]])
+            state["nodes"][node["name"]] = {"key": node["key"], "items": count}
+        record["items"] = sum(len(items) for items in outputs.values())
+
+    # Nodes whose source disappeared are dropped from the state
+    names = {node["name"] for node in nodes}
+    state["nodes"] = {k: v for k, v in state["nodes"].items() if k in names}
+
+    with stage("combine") as record:
+        combined = []
+        for node in nodes:
+            if node["name"] in outputs:
+                combined.extend(outputs[node["name"]])
+            else:
+                combined.extend(
+                    BenchmarkItem.from_dict(row)
+                    for row in jsonio.iter_jsonl(node_output(node))
+                )
+        deduped = merge_benchmarks.dedup(combined)
+        record["items"] = len(deduped)
+    print(f"Removed {len(combined) - len(deduped)} duplicate questions.")
+
+    with stage("write_jsonl") as record:
+        record["items"] = jsonio.write_jsonl(output_file, deduped)
+        passages = get_repository().passages
+        used = {item["passage_id"] for item in deduped if item.get("passage_id")}
+        save_passages({pid: passages[pid] for pid in used}, passages_path(output_file))
+
+    state["output"] = {"key": output_key, "stamp": output_stamp(output_file)}
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    jsonio.write_json(state_path(), state)
+    print(f"Wrote {len(deduped)} items to {output_file}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Incrementally build merged_benchmark.jsonl from SweSAT, Skolprov and SuperLim-2"
+    )
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE)
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild every node, ignoring the cache"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=add_superlim.LOAD_WORKERS,
+        help="Threads used to load SuperLim configs",
+    )
+    parser.add_argument(
+        "--shots",
+        type=int,
+        default=0,
+        help="Prepend the k most similar solved questions from other exams to SweSAT prompts",
+    )
+    parser.add_argument(
+        "--prompt_variant",
+        choices=sorted(prompt_templates.PROMPT_VARIANTS),
+        default=prompt_templates.DEFAULT_VARIANT,
+        help="Subsection instructions of the SweSAT prompts",
+    )
+    args = parser.parse_args(argv)
+    build(
+        args.output,
+        force=args.force,
+        workers=args.workers,
+        shots=args.shots,
+        variant=args.prompt_variant,
+    )
+
+
+if __name__ == "__main__":
+    with pipeline_run("build_benchmark"):
+        main()
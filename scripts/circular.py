@@ -0,0 +1,123 @@
+import numpy as np
+from prompt_templates import option_lines
+
+# Circular evaluation: a multiple-choice item is asked once per cyclic rotation of its
+# options, with the answer letter remapped, and only counts as solved when every
+# rotation is answered correctly. A model with a position bias (always "A", say) gets
+# single rotations right by chance but not all of them.
+LETTERS = ["A", "B", "C", "D", "E"]
+OPTION_FIELDS = ["option_a", "option_b", "option_c", "option_d", "option_e"]
+
+
+def option_block(texts):
+    """The options as listed in the prompts of every source, "A: text" per line."""
+    return option_lines(LETTERS, texts)
+
+
+def rotations(item):
+    """
+    Every cyclic rotation of the item's options, rotation 0 first, as items whose
+    prompt, options and answer are rewritten to match. Returns [] when the item is not
+    multiple choice or its prompt does not list the options in the usual form.
+    """
+    texts = [item.get(field) for field in OPTION_FIELDS]
+    texts = texts[: next((i for i, t in enumerate(texts) if not t), len(texts))]
+    answer = str(item.get("answer", "")).strip()
+    if len(texts) < 2 or answer not in LETTERS[: len(texts)]:
+        return []
+    prompt = item.get("prompt", "")
+    block = option_block(texts)
+    if prompt.count(block) != 1:
+        return []
+
+    n = len(texts)
+    answer_index = LETTERS.index(answer)
+    rotated = []
+    for r in range(n):
+        options = texts[r:] + texts[:r]
+        rotated.append(
+            item.replace(
+                prompt=prompt.replace(block, option_block(options)),
+                answer=LETTERS[(answer_index - r) % n],
+                **dict(zip(OPTION_FIELDS, options + [""] * (5 - n))),
+            )
+        )
+    return rotated
+
+
+def original_letter(letter, rotation, n):
+    """Maps a letter chosen under a rotation back to the option it names in rotation 0."""
+    return LETTERS[(LETTERS.index(letter) + rotation) % n]
+
+
+def common_prefix_length(sequences):
+    """Length of the longest common prefix of sequences (token id lists, say)."""
+    length = min(len(s) for s in sequences)
+    for s in sequences[1:]:
+        length = next(
+            (i for i, (a, b) in enumerate(zip(sequences[0][:length], s)) if a != b),
+            length,
+        )
+    return length
+
+
+def circular_row(item, choices, model_name=""):
+    """
+    Result row for one item from the letters chosen under each rotation. "correct" is
+    the circular verdict (every rotation right); "consistent" means every rotation
+    picked the same underlying option, right or wrong.
+    """
+    n = len(choices)
+    picked = [
+        original_letter(letter, r, n) if letter else ""
+        for r, letter in enumerate(choices)
+    ]
+    answer = str(item.get("answer", "")).strip()
+    hits = sum(letter == answer for letter in picked)
+    return {
+        "uid": item.get("uid", ""),
+        "model": model_name,
+        "source": item.get("source", ""),
+        "subsection": item.get("subsection", ""),
+        "answer": answer,
+        "prediction": ",".join(picked),
+        "correct": hits == n,
+        "rotations": n,
+        "rotation_correct": hits,
+        "consistent": len(set(picked)) == 1,
+    }
+
+
+def circular_summary(rows):
+    """Per-subsection and overall rotation accuracy, circular accuracy and consistency."""
+    rows = list(rows)
+    if not rows:
+        return {}
+    keys = sorted({(row["source"], row["subsection"]) for row in rows})
+    summary = {}
+    for key in keys + [("all", "all")]:
+        group = [
+            row
+            for row in rows
+            if key == ("all", "all") or (row["source"], row["subsection"]) == key
+        ]
+        hits = np.array([row["rotation_correct"] for row in group])
+        n = np.array([row["rotations"] for row in group])
+        summary[key] = {
+            "items": len(group),
+            "accuracy": float(hits.sum() / n.sum()) if len(group) else 0.0,
+            "circular_accuracy": float(np.mean([row["correct"] for row in group])),
+            "consistency": float(np.mean([row["consistent"] for row in group])),
+        }
+    return summary
+
+
+def print_circular_summary(summary):
+    print(
+        f"\n{'Source':<12} {'Subsection':<28} {'items':>6} {'acc':>7} {'circular':>9} {'consistent':>11}"
+    )
+    for (source, subsection), s in summary.items():
+        print(
+            f"{source:<12} {subsection:<28} {s['items']:>6} {s['accuracy']:7.1%} "
+            f"{s['circular_accuracy']:9.1%} {s['consistency']:11.1%}"
+        )
@@ -0,0 +1,121 @@
+import argparse
+import time
+from cpu_backend import BACKENDS
+from evaluate_minilingua import (
+    evaluate_items,
+    load_model,
+    local_generate_fn,
+    release_model,
+)
+from metrics import paired_comparison, results_to_arrays
+from sampling import parse_quotas, stratified_sample
+
+
+def compare_backends(
+    model_name="minilingua-ai/MiniLingua-1b-Instruct",
+    backends=("cpu-int8", "onnx"),
+    dataset_file="merged_benchmark.jsonl",
+    per_stratum=5,
+    quotas=None,
+    tolerance=0.01,
+    seed=42,
+):
+    """
+    Runs the same stratified sample through the cpu-fp32 baseline and each candidate
+    backend, then reports speed, accuracy drift and prediction agreement against fp32.
+    Recommends the fastest backend whose accuracy drop stays within tolerance.
+    """
+    print(f"Sampling multiple-choice dataset from {dataset_file}...")
+    eval_set = stratified_sample(
+        dataset_file, per_stratum=per_stratum, quotas=quotas, seed=seed
+    )
+
+    runs = {}
+    for backend in ["cpu-fp32"] + [b for b in backends if b != "cpu-fp32"]:
+        try:
+            tokenizer, generator = load_model(model_name, backend)
+        except ImportError as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        start = time.perf_counter()
+        rows = evaluate_items(
+            local_generate_fn(generator, tokenizer), eval_set, model_name, log_samples=0
+        )
+        elapsed = time.perf_counter() - start
+        release_model(generator)
+        del tokenizer, generator
+        runs[backend] = {"rows": rows, "seconds": elapsed}
+
+    baseline = runs["cpu-fp32"]
+    base_results = results_to_arrays(baseline["rows"])
+    base_predictions = [row["prediction"] for row in baseline["rows"]]
+
+    print(
+        f"\n{'Backend':<10} {'items/s':>8} {'speedup':>8} {'acc':>7} {'drift':>7} {'95% CI':>17} {'agree':>7}"
+    )
+    recommended = ("cpu-fp32", baseline["seconds"])
+    for backend, run in runs.items():
+        results = results_to_arrays(run["rows"])
+        drift = paired_comparison(results, base_results, by="overall", seed=seed)[0]
+        agreement = sum(
+            row["prediction"] == pred
+            for row, pred in zip(run["rows"], base_predictions)
+        ) / max(len(base_predictions), 1)
+        ci = f"[{drift['ci_low'] * 100:+5.1f}, {drift['ci_high'] * 100:+5.1f}]"
+        print(
+            f"{backend:<10} {len(run['rows']) / run['seconds']:8.2f} "
+            f"{baseline['seconds'] / run['seconds']:7.2f}x {drift['accuracy_a'] * 100:6.1f}% "
+            f"{drift['diff'] * 100:+6.1f} {ci:>17} {agreement * 100:6.1f}%"
+        )
+        if drift["diff"] >= -tolerance and run["seconds"] < recommended[1]:
+            recommended = (backend, run["seconds"])
+
+    print(
+        f"\nFastest backend within {tolerance * 100:.1f} points of fp32 accuracy: {recommended[0]}"
+    )
+    return recommended[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare CPU inference backends for speed and accuracy drift against fp32"
+    )
+    parser.add_argument(
+        "--model_name", type=str, default="minilingua-ai/MiniLingua-1b-Instruct"
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=[b for b in BACKENDS if b != "auto"],
+        default=["cpu-int8", "onnx"],
+    )
+    parser.add_argument("--dataset_file", type=str, default="merged_benchmark.jsonl")
+    parser.add_argument("--per_stratum", type=int, default=5)
+    parser.add_argument(
+        "--quota",
+        action="append",
+        default=[],
+        help="Per-stratum override as source/subsection=N (repeatable)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.01,
+        help="Largest acceptable accuracy drop versus fp32, as a fraction",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    compare_backends(
+        model_name=args.model_name,
+        backends=args.backends,
+        dataset_file=args.dataset_file,
+        per_stratum=args.per_stratum,
+        quotas=parse_quotas(args.quota),
+        tolerance=args.tolerance,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
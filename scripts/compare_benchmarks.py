@@ -1,8 +1,8 @@
-import json
-import glob
+import argparse
 import os
 import re
-from datasets import load_dataset
+from exam_repository import get_repository
+from snapshots import load_snapshot
 
 
 def normalize_text(text):
@@ -16,34 +16,13 @@ def normalize_text(text):
 
 
 def load_local_swesat(base_dir):
-    questions = []
-    for filepath in glob.glob(
-        os.path.join(base_dir, "exams", "**", "*.json"), recursive=True
-    ):
-        if "facit" in filepath.lower():
-            continue
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for item in data:
-                    q_text = item.get("question", "")
-                    if (
-                        item.get("is_accompanied_with_visual") == "yes"
-                        or "visual required" in q_text.lower()
-                    ):
-                        continue
-
-                    if q_text:
-                        item["source_file"] = filepath
-                        questions.append(item)
-        except Exception as e:
-            pass
-    return questions
-
-
-def check_overlaps():
-    print("Loading Swedish Skolprov from HF...")
-    skolprov_ds = load_dataset("Ekgren/swedish_skolprov", "all")
+    repository = get_repository(os.path.join(base_dir, "exams"))
+    return [item for item in repository.text_only() if item.get("question", "")]
+
+
+def check_overlaps(base_dir="."):
+    print("Loading Swedish Skolprov...")
+    skolprov_ds = load_snapshot("Ekgren/swedish_skolprov", "all")
     skolprov_questions = []
 
     split_name = "train" if "train" in skolprov_ds else list(skolprov_ds.keys())[0]
@@ -72,7 +51,7 @@ def check_overlaps():
     print(unique_test_ids)
 
     print("\nLoading local Swesat data...")
-    swesat_questions = load_local_swesat(".")
+    swesat_questions = load_local_swesat(base_dir)
 
     skolprov_norm_set = {
         q["normalized"] for q in skolprov_questions if len(q["normalized"]) > 10
@@ -94,5 +73,16 @@ def check_overlaps():
     print(f"Shared questions (Overlap): {shared_count}")
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Count the local SweSAT questions that also appear in Skolprov"
+    )
+    parser.add_argument(
+        "--base_dir", type=str, default=".", help="Directory containing exams/"
+    )
+    args = parser.parse_args(argv)
+    check_overlaps(args.base_dir)
+
+
 if __name__ == "__main__":
-    check_overlaps()
+    main()
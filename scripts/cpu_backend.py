@@ -0,0 +1,66 @@
+import glob
+import os
+
+BACKENDS = ["auto", "cpu-fp32", "cpu-int8", "onnx"]
+
+
+def physical_core_ids():
+    """
+    Returns one logical CPU id per physical core (the first SMT sibling of each core),
+    read from the Linux sysfs topology. Falls back to every CPU this process may use.
+    """
+    allowed = (
+        sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    )
+    siblings = set()
+    for path in glob.glob(
+        "/sys/devices/system/cpu/cpu[0-9]*/topology/thread_siblings_list"
+    ):
+        try:
+            with open(path, "r") as f:
+                first = f.read().strip().replace("-", ",").split(",")[0]
+            siblings.add(int(first))
+        except (OSError, ValueError):
+            continue
+
+    cores = [cpu for cpu in allowed if cpu in siblings]
+    return cores or allowed or list(range(os.cpu_count() or 1))
+
+
+def pin_to_physical_cores():
+    """
+    Pins this process to one hyperthread per physical core and sizes torch's intra-op
+    pool to match, so matmul workers do not share cores with their SMT siblings.
+    """
+    import torch
+
+    cores = physical_core_ids()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    print(f"Pinned to {len(cores)} physical cores: {cores}")
+    return cores
+
+
+def load_cpu_model(model_name, backend):
+    """Loads a model for CPU inference with the given backend (see BACKENDS)."""
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError:
+            raise ImportError(
+                "The onnx backend needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'"
+            )
+        return ORTModelForCausalLM.from_pretrained(model_name, export=True)
+
+    model = AutoModelForCausalLM.from_pretrained(model_name, dtype=torch.float32)
+    model.eval()
+    if backend == "cpu-int8":
+        # Linear weights are stored as int8; activations are quantized per batch at runtime
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
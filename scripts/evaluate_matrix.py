@@ -0,0 +1,165 @@
+import argparse
+from evaluate_minilingua import evaluate_items, load_model, local_generate_fn, release_model
+from metrics import breakdown, print_breakdown, results_to_arrays, save_results
+from results_store import STORE_PATH, new_run_id, store_results
+from sampling import parse_quotas, stratified_sample
+
+# Models are loaded in float16, plus headroom for activations and the KV cache
+BYTES_PER_PARAM = 2
+LOAD_OVERHEAD = 1.2
+
+
+def estimate_model_gb(model_name):
+    """
+    Estimates the RAM needed to hold a model from its safetensors header on the Hub.
+    Returns None when the estimate is unavailable (offline, or no safetensors weights).
+    """
+    try:
+        from huggingface_hub import get_safetensors_metadata
+
+        metadata = get_safetensors_metadata(model_name)
+        params = sum(metadata.parameter_count.values())
+    except Exception:
+        return None
+    return params * BYTES_PER_PARAM * LOAD_OVERHEAD / 1024**3
+
+
+def schedule_models(models, max_ram_gb=None, overrides=None):
+    """
+    Orders models smallest first and drops the ones whose estimate exceeds max_ram_gb.
+    Only one model is resident at a time, so the peak is the largest scheduled model.
+    Models without an estimate are run last.
+    """
+    overrides = overrides or {}
+    estimates = {m: overrides.get(m, estimate_model_gb(m)) for m in models}
+
+    scheduled, skipped = [], []
+    for model_name in models:
+        gb = estimates[model_name]
+        if max_ram_gb is not None and gb is not None and gb > max_ram_gb:
+            skipped.append((model_name, gb))
+        else:
+            scheduled.append((model_name, gb))
+    scheduled.sort(key=lambda job: (job[1] is None, job[1] or 0))
+    return scheduled, skipped
+
+
+def parse_ram_overrides(specs):
+    overrides = {}
+    for spec in specs or []:
+        model_name, _, gb = spec.rpartition("=")
+        overrides[model_name] = float(gb)
+    return overrides
+
+
+def run_matrix(
+    models,
+    tasks=None,
+    dataset_file="merged_benchmark.jsonl",
+    per_stratum=5,
+    quotas=None,
+    max_ram_gb=None,
+    ram_overrides=None,
+    results_file="matrix_results.jsonl",
+    store_file=None,
+    seed=42,
+):
+    # The evaluation set is sampled once and shared by every model
+    print(f"Sampling multiple-choice dataset from {dataset_file}...")
+    eval_set = stratified_sample(
+        dataset_file, per_stratum=per_stratum, quotas=quotas, seed=seed, tasks=tasks
+    )
+
+    scheduled, skipped = schedule_models(models, max_ram_gb, ram_overrides)
+    for model_name, gb in skipped:
+        print(f"Skipping {model_name}: needs ~{gb:.1f} GB, limit is {max_ram_gb:.1f} GB.")
+
+    all_rows = []
+    for model_name, gb in scheduled:
+        estimate = f"~{gb:.1f} GB" if gb is not None else "unknown size"
+        print(f"\n=== {model_name} ({estimate}) on {len(eval_set)} samples ===")
+        tokenizer, generator = load_model(model_name)
+        rows = evaluate_items(
+            local_generate_fn(generator, tokenizer), eval_set, model_name, log_samples=0
+        )
+        release_model(generator)
+        del tokenizer, generator
+
+        print_breakdown(breakdown(results_to_arrays(rows), seed=seed))
+        all_rows.extend(rows)
+        if store_file:
+            # One run per model, all sharing the matrix's evaluation set
+            run_id = store_results(
+                rows,
+                store_file,
+                new_run_id(model_name),
+                model_name,
+                dataset_file=dataset_file,
+                mode="matrix",
+                seed=seed,
+            )
+            print(f"Stored {len(rows)} results in {store_file} as run {run_id}.")
+
+    save_results(all_rows, results_file)
+    print(f"\nSaved {len(all_rows)} results for {len(scheduled)} models to {results_file}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate several models on the same benchmark subset, loading each once"
+    )
+    parser.add_argument("--models", nargs="+", required=True)
+    parser.add_argument(
+        "--tasks",
+        nargs="*",
+        default=[],
+        help="Sources or source/subsection pairs to evaluate, e.g. swesat superlim-2/swefaq",
+    )
+    parser.add_argument("--dataset_file", type=str, default="merged_benchmark.jsonl")
+    parser.add_argument("--per_stratum", type=int, default=5)
+    parser.add_argument(
+        "--quota",
+        action="append",
+        default=[],
+        help="Per-stratum override as source/subsection=N (repeatable)",
+    )
+    parser.add_argument(
+        "--max_ram_gb",
+        type=float,
+        default=None,
+        help="Skip models whose estimated footprint exceeds this limit",
+    )
+    parser.add_argument(
+        "--model_ram_gb",
+        action="append",
+        default=[],
+        help="Override the footprint estimate as model=GB (repeatable)",
+    )
+    parser.add_argument("--results", type=str, default="matrix_results.jsonl")
+    parser.add_argument(
+        "--store",
+        type=str,
+        nargs="?",
+        const=STORE_PATH,
+        default=None,
+        help=f"Also record each model's results as a run in the SQLite results store (default {STORE_PATH})",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run_matrix(
+        args.models,
+        tasks=args.tasks,
+        dataset_file=args.dataset_file,
+        per_stratum=args.per_stratum,
+        quotas=parse_quotas(args.quota),
+        max_ram_gb=args.max_ram_gb,
+        ram_overrides=parse_ram_overrides(args.model_ram_gb),
+        results_file=args.results,
+        store_file=args.store,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,872 @@
-import torch
-import json
-import random
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+import argparse
+import gc
+import threading
+import time
+from contextlib import nullcontext
 from tqdm import tqdm
+# torch and transformers are imported by the functions that run the model, so this
+# module (and `swesat eval --help`) loads without them
+from instrumentation import RunRecorder, print_timing_summary
+from cpu_backend import BACKENDS, load_cpu_model, pin_to_physical_cores
+from adaptive import (
+    adaptive_evaluate,
+    load_baselines,
+    print_adaptive_report,
+    save_report,
+)
+from circular import (
+    circular_row,
+    circular_summary,
+    print_circular_summary,
+    rotations,
+    common_prefix_length,
+)
+from scoring import print_scoring_summary, score, score_results, scoring_summary
+from metrics import breakdown, print_breakdown, results_to_arrays, save_results
+from prefetch import Consumer, prefetch
+from prompt_templates import PROMPT_VARIANTS
+from results_store import STORE_PATH, store_results
+from worker_client import DEFAULT_WORKER_URL, connect_worker
+from sampling import (
+    iter_jsonl,
+    parse_quotas,
+    stratified_reservoir_sample,
+    stratified_sample,
+)
 
 
-def run_evaluation():
-    model_name = "minilingua-ai/MiniLingua-1b-Instruct"
-    print(f"Loading {model_name}...")
+def load_model(model_name, backend="auto"):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+    print(f"Loading {model_name} ({backend} backend)...")
 
     tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(
-        model_name, device_map="auto", dtype=torch.float16
-    )
+    if backend == "auto":
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name, device_map="auto", dtype=torch.float16
+        )
+    else:
+        pin_to_physical_cores()
+        model = load_cpu_model(model_name, backend)
+    # Batched generation of decoder-only models needs left padding and a pad token
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
     generator = pipeline(
         "text-generation", model=model, tokenizer=tokenizer, trust_remote_code=True
     )
+    return tokenizer, generator
 
-    # Load the merged dataset JSONL
-    dataset_file = "merged_benchmark.jsonl"
-    print(f"Loading multiple-choice dataset from {dataset_file}...")
-    samples = []
-    with open(dataset_file, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                item = json.loads(line)
-                samples.append(item)
-
-    # Select 50 random samples with a known short answer to evaluate
-    random.seed(42)
-    eval_set = random.sample(samples, min(50, len(samples)))
-
-    correct = 0
-    total = len(eval_set)
-    cnt = 0
-
-    print(f"Evaluating on {total} samples...")
-    for item in tqdm(eval_set):
-        sys_prompt = item.get("system_prompt", "")
-        prompt = item.get("prompt", "")
-        messages = [
-            {
-                "role": "user",
-                "content": f"{sys_prompt}\n\n{prompt}".strip()
-                if sys_prompt
-                else prompt.strip(),
-            }
-        ]
 
-        # MiniLingua uses standard formatting usually, but let's just supply it raw if no chat template applies.
-        try:
-            formatted_prompt = tokenizer.apply_chat_template(
-                messages, tokenize=False, add_generation_prompt=True
-            )
-        except Exception:
-            formatted_prompt = (
-                f"{sys_prompt}\n\n{prompt}".strip() if sys_prompt else prompt.strip()
-            )
-            formatted_prompt += "\nSvar:"
+def release_model(generator):
+    """Drops the pipeline's model so the next one can be loaded into the freed memory."""
+    import torch
+
+    generator.model = None
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def format_prompt(tokenizer, item):
+    sys_prompt = item.get("system_prompt", "")
+    prompt = item.get("prompt", "")
+    messages = [
+        {
+            "role": "user",
+            "content": f"{sys_prompt}\n\n{prompt}".strip()
+            if sys_prompt
+            else prompt.strip(),
+        }
+    ]
+
+    # MiniLingua uses standard formatting usually, but let's just supply it raw if no chat template applies.
+    try:
+        formatted_prompt = tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+    except Exception:
+        formatted_prompt = (
+            f"{sys_prompt}\n\n{prompt}".strip() if sys_prompt else prompt.strip()
+        )
+        formatted_prompt += "\nSvar:"
+    return formatted_prompt
+
+
+def clean_generation(generated_text):
+    generated_text = generated_text.strip()
+    if "Svar:" in generated_text:
+        generated_text = generated_text.split("Svar:")[-1].strip()
+    return generated_text
+
 
-        outputs = generator(
-            formatted_prompt,
+class PrefillTimer:
+    """
+    Logits processor marking the first generation step, which runs right after the
+    prompt's forward pass.
+    """
+
+    def __init__(self):
+        self.first_step = None
+
+    def __call__(self, input_ids, scores):
+        if self.first_step is None:
+            self.first_step = time.perf_counter()
+        return scores
+
+
+def prepare_batch(tokenizer, batch, lock=None):
+    """Formats and tokenizes a batch into padded CPU tensors: (batch, inputs)."""
+    formatted_prompts = [format_prompt(tokenizer, item) for item in batch]
+    # A fast tokenizer must not be called from two threads at once
+    with lock or nullcontext():
+        inputs = tokenizer(formatted_prompts, return_tensors="pt", padding=True)
+    return batch, inputs
+
+
+def run_batch(generator, tokenizer, inputs, recorder=None):
+    """
+    Generates answers for a prepared batch. Returns a generation per row: its cleaned
+    text and the row's prompt and generated token counts.
+    """
+    import torch
+    from transformers import LogitsProcessorList
+
+    recorder = recorder or RunRecorder()
+    model = generator.model
+    inputs = inputs.to(model.device)
+    timer = PrefillTimer()
+    started = time.perf_counter()
+    with torch.no_grad():
+        output_ids = model.generate(
+            **inputs,
             max_new_tokens=15,
-            max_length=None,
             do_sample=False,
-            return_full_text=False,
+            pad_token_id=tokenizer.pad_token_id,
+            logits_processor=LogitsProcessorList([timer]),
         )
-        generated_text = outputs[0]["generated_text"].strip()
+    finished = time.perf_counter()
+    first_step = timer.first_step or finished
+    recorder.record("prefill", first_step - started, started)
+    recorder.record("decode", finished - first_step, first_step)
 
-        if "Svar:" in generated_text:
-            generated_text = generated_text.split("Svar:")[-1].strip()
+    new_tokens = output_ids[:, inputs["input_ids"].shape[1] :]
+    prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+    generated_tokens = (new_tokens != tokenizer.pad_token_id).sum(dim=1).tolist()
+    recorder.count("prompt_tokens", sum(prompt_tokens))
+    recorder.count("generated_tokens", sum(generated_tokens))
+    with recorder.span("detokenize"):
+        texts = tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+    return [
+        {
+            "text": clean_generation(text),
+            "prompt_tokens": prompt,
+            "generated_tokens": generated,
+        }
+        for text, prompt, generated in zip(texts, prompt_tokens, generated_tokens)
+    ]
 
-        expected_answer = str(item.get("answer", "")).strip()
 
-        if expected_answer.lower() in generated_text.lower():
-            correct += 1
+def generate_batch(generator, tokenizer, items, batch_size=1, recorder=None):
+    recorder = recorder or RunRecorder()
+    generations = []
+    for start in range(0, len(items), batch_size):
+        with recorder.span("tokenize"):
+            _, inputs = prepare_batch(tokenizer, items[start : start + batch_size])
+        generations.extend(run_batch(generator, tokenizer, inputs, recorder))
+    return generations
+
+
+def letter_token_ids(tokenizer, letters):
+    """
+    Candidate tokens for each answer letter, with and without a leading space. The last
+    token of each encoding is taken, since SentencePiece tokenizers may encode " A" as
+    a bare "▁" followed by "A", and only tokens that decode to the letter are kept.
+    """
+    candidates = [
+        sorted(
+            {
+                token
+                for text in (letter, f" {letter}")
+                for token in tokenizer.encode(text, add_special_tokens=False)[-1:]
+                if tokenizer.decode([token]).strip() == letter
+            }
+        )
+        for letter in letters
+    ]
+    seen = [token for ids in candidates for token in ids]
+    assert all(candidates) and len(seen) == len(set(seen)), candidates
+    return candidates
+
+
+def score_rotations(generator, tokenizer, items, recorder=None):
+    """
+    Picks an answer letter for every rotation of one item from a single batched forward
+    pass: the prompt tokens the rotations share are run once and their KV cache reused
+    by every rotation, and the answer is the letter with the highest next-token logit,
+    so nothing is generated.
+    """
+    import torch
+
+    recorder = recorder or RunRecorder()
+    model = generator.model
+    n = len(items)
+    # An item has as many rotations as options
+    letters = ["A", "B", "C", "D", "E"][:n]
+    candidates = letter_token_ids(tokenizer, letters)
+
+    with recorder.span("tokenize"):
+        # Whole prompts are tokenized as in prepare_batch, so every rotation sees the
+        # same tokens as on the normal path; the cached part is their common prefix,
+        # short of each prompt's last token, whose logits are needed
+        encoded = tokenizer([format_prompt(tokenizer, item) for item in items])
+        sequences = encoded["input_ids"]
+        shared = min(
+            common_prefix_length(sequences), min(len(s) for s in sequences) - 1
+        )
+        prefix_ids = torch.tensor([sequences[0][:shared]], dtype=torch.long)
+        # Right padding, built here rather than through the shared tokenizer's
+        # padding_side, which prepare_batch relies on being left
+        suffixes = [s[shared:] for s in sequences]
+        width = max(len(s) for s in suffixes)
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+        input_ids = torch.full((n, width), pad_id, dtype=torch.long)
+        suffix_mask = torch.zeros((n, width), dtype=torch.long)
+        for i, suffix in enumerate(suffixes):
+            input_ids[i, : len(suffix)] = torch.tensor(suffix, dtype=torch.long)
+            suffix_mask[i, : len(suffix)] = 1
+
+    with recorder.span("prefill"), torch.no_grad():
+        input_ids = input_ids.to(model.device)
+        attention_mask = suffix_mask.to(model.device)
+        cache = None
+        if prefix_ids.shape[1]:
+            cache = model(prefix_ids.to(model.device), use_cache=True).past_key_values
+            cache.batch_repeat_interleave(n)
+            attention_mask = torch.cat(
+                [
+                    torch.ones(
+                        n,
+                        prefix_ids.shape[1],
+                        dtype=attention_mask.dtype,
+                        device=model.device,
+                    ),
+                    attention_mask,
+                ],
+                dim=1,
+            )
+        logits = model(
+            input_ids=input_ids, attention_mask=attention_mask, past_key_values=cache
+        ).logits
+    recorder.count("prompt_tokens", shared + int(suffix_mask.sum()))
+
+    # Right padding: each row's next-token logits sit at its last real token
+    last = suffix_mask.sum(dim=1).to(model.device) - 1
+    next_logits = logits[torch.arange(n, device=model.device), last].float()
+    scores = torch.stack(
+        [next_logits[:, ids].max(dim=1).values for ids in candidates], dim=1
+    )
+    return [letters[i] for i in scores.argmax(dim=1).tolist()]
+
+
+def local_generate_fn(generator, tokenizer, batch_size=1, recorder=None):
+    return lambda items: generate_batch(
+        generator, tokenizer, items, batch_size, recorder
+    )
+
+
+def get_generate_fn(
+    model_name, worker_url=None, batch_size=1, backend="auto", recorder=None
+):
+    """
+    Returns (generate_fn, generator): generate_fn maps a list of items to generations.
+    A resident inference worker serving model_name is used when one is reachable, in which
+    case generator is None; otherwise the model is loaded in-process.
+    """
+    generate_fn = connect_worker(worker_url, model_name) if worker_url else None
+    if generate_fn is not None:
+        print(f"Using inference worker at {worker_url} for {model_name}.")
+        return generate_fn, None
+    recorder = recorder or RunRecorder()
+    with recorder.span("model_load"):
+        tokenizer, generator = load_model(model_name, backend)
+    return local_generate_fn(generator, tokenizer, batch_size, recorder), generator
+
+
+def result_row(
+    item,
+    generated_text,
+    correct,
+    model_name="",
+    latency=None,
+    parsed=None,
+    prompt_tokens=None,
+    generated_tokens=None,
+):
+    return {
+        "uid": item.get("uid", ""),
+        "model": model_name,
+        "source": item.get("source", ""),
+        "subsection": item.get("subsection", ""),
+        "answer": item.get("answer", ""),
+        "prediction": generated_text,
+        "parsed": parsed,
+        "correct": correct,
+        "latency": latency,
+        "prompt_tokens": prompt_tokens,
+        "generated_tokens": generated_tokens,
+    }
+
+
+def save_run(
+    rows, results_file=None, store_file=None, run_id=None, model_name="", **metadata
+):
+    """Writes per-item results to a JSONL file and/or the results store."""
+    if results_file:
+        save_results(rows, results_file)
+        print(f"Saved per-item results to {results_file}.")
+    if store_file:
+        run_id = store_results(rows, store_file, run_id, model_name, **metadata)
+        print(f"Stored {len(rows)} results in {store_file} as run {run_id}.")
+
+
+def score_chunk(
+    rows, chunk, generations, latency, model_name="", log_samples=10, recorder=None
+):
+    """Appends a result row per item of a generated chunk to rows."""
+    recorder = recorder or RunRecorder()
+    for item, generation in zip(chunk, generations):
+        recorder.record("item_latency", latency)
+        generated_text = generation["text"]
+        expected_answer = str(item.get("answer", "")).strip()
+        parsed, correct = score(item, generated_text)
+        rows.append(
+            result_row(
+                item,
+                generated_text,
+                correct,
+                model_name,
+                latency,
+                parsed,
+                generation["prompt_tokens"],
+                generation["generated_tokens"],
+            )
+        )
 
         # Log 10 sample runs for debugging to show qualitative Swedish abilities
-        if cnt < 10:
+        if len(rows) <= log_samples:
             print(
-                f"\n[Q]: {prompt[:100]}...\n[Expected]: {expected_answer}\n[Generated (Swedish)]: {generated_text}"
+                f"\n[Q]: {item.get('prompt', '')[:100]}...\n[Expected]: {expected_answer}\n[Generated (Swedish)]: {generated_text}"
+            )
+
+
+def evaluate_items(
+    generate_fn, items, model_name="", log_samples=10, chunk_size=8, recorder=None
+):
+    recorder = recorder or RunRecorder()
+    rows = []
+    progress = tqdm(total=len(items))
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start : start + chunk_size]
+        started = time.perf_counter()
+        generations = generate_fn(chunk)
+        # Items of a chunk are generated together, so they share the chunk's latency
+        latency = (time.perf_counter() - started) / len(chunk)
+        score_chunk(
+            rows, chunk, generations, latency, model_name, log_samples, recorder
+        )
+        progress.update(len(chunk))
+    progress.close()
+    return rows
+
+
+def evaluate_pipelined(
+    generator,
+    tokenizer,
+    items,
+    model_name="",
+    batch_size=1,
+    prefetch_workers=2,
+    log_samples=10,
+    recorder=None,
+):
+    """
+    evaluate_items() for an in-process model, with the Python work taken off the model
+    thread: prefetch_workers threads format and tokenize the next batches while the
+    current one is generated, and a consumer thread scores and logs finished batches.
+    """
+    recorder = recorder or RunRecorder()
+    rows = []
+    progress = tqdm(total=len(items))
+    lock = threading.Lock()
+
+    def prepare(batch):
+        with recorder.span("tokenize"):
+            return prepare_batch(tokenizer, batch, lock)
+
+    def score(finished):
+        chunk, generations, latency = finished
+        with recorder.span("score"):
+            score_chunk(
+                rows, chunk, generations, latency, model_name, log_samples, recorder
             )
-        cnt += 1
+        progress.update(len(chunk))
+
+    batches = (
+        items[start : start + batch_size] for start in range(0, len(items), batch_size)
+    )
+    depth = 2 * prefetch_workers
+    with Consumer(score, depth=depth, recorder=recorder) as consumer:
+        for chunk, inputs in prefetch(
+            prepare, batches, prefetch_workers, depth, recorder
+        ):
+            started = time.perf_counter()
+            generations = run_batch(generator, tokenizer, inputs, recorder)
+            latency = (time.perf_counter() - started) / len(chunk)
+            consumer.put((chunk, generations, latency))
+    progress.close()
+    print_pipeline_report(recorder)
+    return rows
+
+
+def print_pipeline_report(recorder):
+    """Where the model thread spent its time, and so which stage limits throughput."""
+    busy = sum(recorder.durations["prefill"]) + sum(recorder.durations["decode"])
+    starved = sum(recorder.durations["prepare_stall"])
+    blocked = sum(recorder.durations["consume_stall"])
+    stage = max(
+        [("model", busy), ("preparation", starved), ("scoring", blocked)],
+        key=lambda pair: pair[1],
+    )[0]
+    print(
+        f"\nPipeline: model busy {busy:.2f}s, waited {starved:.2f}s for prepared batches "
+        f"and {blocked:.2f}s on scoring; bottleneck: {stage}."
+    )
+
+
+def run_evaluation(
+    model_name="minilingua-ai/MiniLingua-1b-Instruct",
+    dataset_file="merged_benchmark.jsonl",
+    per_stratum=5,
+    quotas=None,
+    results_file=None,
+    store_file=None,
+    run_id=None,
+    worker_url=None,
+    batch_size=1,
+    prefetch_workers=2,
+    backend="auto",
+    timing_file=None,
+    trace_file=None,
+    seed=42,
+    prompt_variant=None,
+):
+    recorder = RunRecorder(trace=bool(trace_file))
+    generate_fn, generator = get_generate_fn(
+        model_name, worker_url, batch_size, backend, recorder
+    )
+
+    # Stream the merged dataset JSONL and keep a fixed-size sample per (source, subsection)
+    print(f"Sampling multiple-choice dataset from {dataset_file}...")
+    eval_set = stratified_sample(
+        dataset_file,
+        per_stratum=per_stratum,
+        quotas=quotas,
+        seed=seed,
+        prompt_variant=prompt_variant,
+    )
+
+    print(f"Evaluating on {len(eval_set)} samples...")
+    if generator is not None and prefetch_workers > 0:
+        rows = evaluate_pipelined(
+            generator,
+            generator.tokenizer,
+            eval_set,
+            model_name,
+            batch_size=batch_size,
+            prefetch_workers=prefetch_workers,
+            recorder=recorder,
+        )
+    else:
+        rows = evaluate_items(
+            generate_fn,
+            eval_set,
+            model_name,
+            chunk_size=max(batch_size, 8),
+            recorder=recorder,
+        )
+    correct = sum(row["correct"] for row in rows)
+    total = len(rows)
+    unparseable = sum(row["parsed"] is None for row in rows)
 
-    # Note: Accuracy will be roughly 0% because the model answers in Swedish while SuperLim tags are English.
-    # A true evaluation harness (like lm-evaluation-harness) uses loglikelihoods or translated label maps!
     accuracy = correct / total
     print("\nEvaluation Complete!")
     print(
-        f"Exact string match Accuracy: {accuracy * 100:.2f}% ({correct}/{total}) - Note: Expect low exact match due to Swedish/English label mismatches in non-MCQA SuperLim tasks."
+        f"Accuracy: {accuracy * 100:.2f}% ({correct}/{total}), {unparseable} unparseable outputs."
+    )
+    print_scoring_summary(scoring_summary(rows, score_results(rows)))
+    print_breakdown(breakdown(results_to_arrays(rows), seed=seed))
+    save_run(
+        rows,
+        results_file,
+        store_file,
+        run_id,
+        model_name,
+        dataset_file=dataset_file,
+        mode="sample",
+        seed=seed,
+    )
+    write_timings(recorder, timing_file, trace_file, model=model_name, backend=backend)
+
+
+def run_circular_evaluation(
+    model_name="minilingua-ai/MiniLingua-1b-Instruct",
+    dataset_file="merged_benchmark.jsonl",
+    per_stratum=5,
+    quotas=None,
+    results_file=None,
+    store_file=None,
+    run_id=None,
+    backend="auto",
+    timing_file=None,
+    trace_file=None,
+    seed=42,
+    prompt_variant=None,
+):
+    """
+    Asks every multiple-choice item of the sample under all cyclic rotations of its
+    options. Rotations are scored together by next-token letter logits, so this needs
+    the model in-process rather than an inference worker.
+    """
+    recorder = RunRecorder(trace=bool(trace_file))
+    with recorder.span("model_load"):
+        tokenizer, generator = load_model(model_name, backend)
+
+    print(f"Sampling multiple-choice dataset from {dataset_file}...")
+    eval_set = stratified_sample(
+        dataset_file,
+        per_stratum=per_stratum,
+        quotas=quotas,
+        seed=seed,
+        prompt_variant=prompt_variant,
+    )
+    rotated = [(item, rotations(item)) for item in eval_set]
+    rotated = [(item, items) for item, items in rotated if items]
+    print(
+        f"Circular evaluation of {len(rotated)} of {len(eval_set)} samples "
+        f"({sum(len(items) for _, items in rotated)} rotations)..."
+    )
+
+    rows = []
+    for item, items in tqdm(rotated):
+        started = time.perf_counter()
+        choices = score_rotations(generator, tokenizer, items, recorder)
+        latency = time.perf_counter() - started
+        recorder.record("item_latency", latency, started)
+        rows.append({**circular_row(item, choices, model_name), "latency": latency})
+
+    print("\nCircular Evaluation Complete!")
+    print_circular_summary(circular_summary(rows))
+    # The breakdown's accuracy is the circular one: an item counts only if all rotations are right
+    print_breakdown(breakdown(results_to_arrays(rows), seed=seed))
+    save_run(
+        rows,
+        results_file,
+        store_file,
+        run_id,
+        model_name,
+        dataset_file=dataset_file,
+        mode="circular",
+        seed=seed,
+    )
+    write_timings(recorder, timing_file, trace_file, model=model_name, backend=backend)
+
+
+def write_timings(recorder, timing_file=None, trace_file=None, **metadata):
+    summary = recorder.summary(**metadata)
+    print_timing_summary(summary)
+    if timing_file:
+        recorder.write_summary(timing_file, **metadata)
+        print(f"Saved timing summary to {timing_file}.")
+    if trace_file:
+        recorder.write_trace(trace_file)
+        print(f"Saved trace to {trace_file}.")
+
+
+def run_adaptive_evaluation(
+    model_name="minilingua-ai/MiniLingua-1b-Instruct",
+    dataset_file="merged_benchmark.jsonl",
+    max_per_stratum=500,
+    quotas=None,
+    target_width=0.2,
+    min_items=10,
+    baseline_file=None,
+    report_file=None,
+    results_file=None,
+    store_file=None,
+    run_id=None,
+    worker_url=None,
+    backend="auto",
+    timing_file=None,
+    trace_file=None,
+    seed=42,
+    prompt_variant=None,
+):
+    """
+    Evaluates each (source, subsection) in random order and stops it as soon as its
+    Wilson interval is narrower than target_width, or the comparison against a baseline
+    report is decided.
+    """
+    recorder = RunRecorder(trace=bool(trace_file))
+    generate_fn, _ = get_generate_fn(
+        model_name, worker_url, backend=backend, recorder=recorder
+    )
+
+    print(f"Sampling up to {max_per_stratum} items per stratum from {dataset_file}...")
+    strata, _ = stratified_reservoir_sample(
+        iter_jsonl(dataset_file, prompt_variant),
+        per_stratum=max_per_stratum,
+        quotas=quotas,
+        seed=seed,
+    )
+    baselines = load_baselines(baseline_file) if baseline_file else None
+
+    progress = tqdm(total=sum(len(items) for items in strata.values()))
+    rows = []
+
+    def score_item(item):
+        progress.update(1)
+        started = time.perf_counter()
+        generation = generate_fn([item])[0]
+        latency = time.perf_counter() - started
+        recorder.record("item_latency", latency, started)
+        generated_text = generation["text"]
+        parsed, item_correct = score(item, generated_text)
+        rows.append(
+            result_row(
+                item,
+                generated_text,
+                item_correct,
+                model_name,
+                latency,
+                parsed,
+                generation["prompt_tokens"],
+                generation["generated_tokens"],
+            )
+        )
+        return item_correct
+
+    report = adaptive_evaluate(
+        strata,
+        score_item,
+        target_width=target_width,
+        min_items=min_items,
+        baselines=baselines,
+        seed=seed,
+    )
+    progress.close()
+
+    print("\nAdaptive Evaluation Complete!")
+    print_adaptive_report(report)
+    if report_file:
+        save_report(report, report_file)
+        print(f"Saved per-subsection report to {report_file}.")
+    save_run(
+        rows,
+        results_file,
+        store_file,
+        run_id,
+        model_name,
+        dataset_file=dataset_file,
+        mode="adaptive",
+        seed=seed,
+    )
+    write_timings(recorder, timing_file, trace_file, model=model_name, backend=backend)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate a causal LM on a stratified sample of the merged benchmark"
+    )
+    parser.add_argument(
+        "--model_name", type=str, default="minilingua-ai/MiniLingua-1b-Instruct"
+    )
+    parser.add_argument("--dataset_file", type=str, default="merged_benchmark.jsonl")
+    parser.add_argument(
+        "--per_stratum",
+        type=int,
+        default=5,
+        help="Items sampled per (source, subsection) stratum",
+    )
+    parser.add_argument(
+        "--quota",
+        action="append",
+        default=[],
+        help="Per-stratum override as source/subsection=N, e.g. swesat/NOG=20 (repeatable)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--results",
+        type=str,
+        default=None,
+        help="Write per-item results JSONL for scripts/metrics.py",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        nargs="?",
+        const=STORE_PATH,
+        default=None,
+        help=f"Also record per-item results in the SQLite results store (default {STORE_PATH})",
+    )
+    parser.add_argument(
+        "--run_id",
+        type=str,
+        default=None,
+        help="Run id in the results store (default: timestamp and model name)",
+    )
+    parser.add_argument(
+        "--worker_url",
+        type=str,
+        default=DEFAULT_WORKER_URL,
+        help="Submit to a running scripts/inference_worker.py here; loads the model in-process if none answers",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1,
+        help="Generation batch size when the model is loaded in-process",
+    )
+    parser.add_argument(
+        "--prefetch_workers",
+        type=int,
+        default=2,
+        help="Threads preparing the next batches while the in-process model generates (0: prepare, generate and score one after another)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="auto",
+        help="auto: fp16 with device_map=auto; cpu-*/onnx: CPU inference pinned to physical cores",
+    )
+    parser.add_argument(
+        "--timing_summary",
+        type=str,
+        default=None,
+        help="Write latency histograms, token counts and tokens/s as a JSON run summary",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Write a Chrome trace (chrome://tracing, Perfetto) of every timed span",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Stop each subsection early once its accuracy confidence interval is tight enough",
+    )
+    parser.add_argument(
+        "--max_per_stratum",
+        type=int,
+        default=500,
+        help="Adaptive mode: candidate pool size per stratum",
+    )
+    parser.add_argument(
+        "--target_width",
+        type=float,
+        default=0.2,
+        help="Adaptive mode: stop a subsection when its 95%% Wilson interval is narrower than this",
+    )
+    parser.add_argument(
+        "--min_items",
+        type=int,
+        default=10,
+        help="Adaptive mode: minimum items per subsection before stopping",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Adaptive mode: report JSON of a baseline run; stop once the comparison is decided",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Adaptive mode: write the per-subsection report to this JSON file",
+    )
+    parser.add_argument(
+        "--circular",
+        action="store_true",
+        help="Ask every multiple-choice item under all rotations of its options and report consistency",
+    )
+    parser.add_argument(
+        "--prompt_variant",
+        choices=sorted(PROMPT_VARIANTS),
+        default=None,
+        help="Re-render SweSAT prompts with this variant's instructions instead of the dataset's",
+    )
+    args = parser.parse_args(argv)
+
+    if args.circular:
+        run_circular_evaluation(
+            model_name=args.model_name,
+            dataset_file=args.dataset_file,
+            per_stratum=args.per_stratum,
+            quotas=parse_quotas(args.quota),
+            results_file=args.results,
+            store_file=args.store,
+            run_id=args.run_id,
+            backend=args.backend,
+            timing_file=args.timing_summary,
+            trace_file=args.trace,
+            seed=args.seed,
+            prompt_variant=args.prompt_variant,
+        )
+        return
+
+    if args.adaptive:
+        run_adaptive_evaluation(
+            model_name=args.model_name,
+            dataset_file=args.dataset_file,
+            max_per_stratum=args.max_per_stratum,
+            quotas=parse_quotas(args.quota),
+            target_width=args.target_width,
+            min_items=args.min_items,
+            baseline_file=args.baseline,
+            report_file=args.report,
+            results_file=args.results,
+            store_file=args.store,
+            run_id=args.run_id,
+            worker_url=args.worker_url,
+            backend=args.backend,
+            timing_file=args.timing_summary,
+            trace_file=args.trace,
+            seed=args.seed,
+            prompt_variant=args.prompt_variant,
+        )
+        return
+
+    run_evaluation(
+        model_name=args.model_name,
+        dataset_file=args.dataset_file,
+        per_stratum=args.per_stratum,
+        quotas=parse_quotas(args.quota),
+        results_file=args.results,
+        store_file=args.store,
+        run_id=args.run_id,
+        worker_url=args.worker_url,
+        batch_size=args.batch_size,
+        prefetch_workers=args.prefetch_workers,
+        backend=args.backend,
+        timing_file=args.timing_summary,
+        trace_file=args.trace,
+        seed=args.seed,
+        prompt_variant=args.prompt_variant,
     )
 
 
 if __name__ == "__main__":
-    run_evaluation()
+    main()
@@ -0,0 +1,141 @@
+import functools
+import os
+import pickle
+import re
+import jsonio
+from passages import intern_passages, load_passages, passages_path
+
+EXAMS_DIR = "exams"
+CACHE_PATH = os.environ.get("SWESAT_EXAM_CACHE", os.path.join(".cache", "exams.pkl"))
+# Bump when the index layout changes so stale caches are rebuilt
+CACHE_VERSION = 2
+
+PROVPASS_RE = re.compile(r"provpass-\d+")
+
+
+def is_visual(item):
+    return (
+        item.get("is_accompanied_with_visual") == "yes"
+        or "visual required" in item.get("question", "").lower()
+    )
+
+
+def exam_files(exams_dir):
+    """(relative path, mtime_ns, size) of every JSON file below exams_dir, sorted."""
+    files = []
+    for root, _, names in os.walk(exams_dir):
+        for name in names:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append(
+                    (os.path.relpath(path, exams_dir), stat.st_mtime_ns, stat.st_size)
+                )
+    return sorted(files)
+
+
+def build_index(exams_dir, files):
+    """
+    Parses every exam once into a flat index keyed by (date, provpass, question_number).
+    Each entry is the question as stored in the exam JSON plus its date, provpass,
+    section (file name stem), source file and the answer from the date's facit.
+    Returns (index, passages), with reading passages referenced by "passage_id".
+    """
+    paths = [os.path.join(exams_dir, rel_path) for rel_path, _, _ in files]
+    facits = {}
+    for path in paths:
+        if "facit" not in os.path.basename(path).lower():
+            continue
+        date = os.path.basename(os.path.dirname(path))
+        if date in facits:
+            continue
+        try:
+            facits[date] = jsonio.read_json(path)
+        except Exception as e:
+            print(f"Failed to load facit {path}: {e}")
+
+    passages = {}
+    for date_dir in sorted({os.path.dirname(path) for path in paths}):
+        passages.update(load_passages(passages_path(date_dir)))
+
+    index = {}
+    for path in paths:
+        filename = os.path.basename(path)
+        if "facit" in filename.lower() or filename == "passages.json":
+            continue
+        try:
+            data = jsonio.read_json(path)
+        except Exception:
+            continue
+
+        date = os.path.basename(os.path.dirname(path))
+        match = PROVPASS_RE.search(filename)
+        provpass = match.group(0) if match else None
+        answers = facits.get(date, {}).get(provpass, {}) if provpass else {}
+        # Exams parsed before the passages table existed still carry inline passages
+        data, passages = intern_passages(data, passages)
+        for item in data:
+            q_num = item.get("question_number")
+            index[(date, provpass, q_num)] = {
+                **item,
+                "date": date,
+                "provpass": provpass,
+                "section": filename.split(".")[0],
+                "source_file": path,
+                "answer": answers.get(str(q_num)),
+            }
+    return index, passages
+
+
+class ExamRepository:
+    """
+    Every local SweSAT exam question, scanned once and cached on disk. The cache is
+    rebuilt when any file under exams/ is added, removed or modified.
+    """
+
+    def __init__(self, exams_dir=EXAMS_DIR, cache_path=CACHE_PATH):
+        self.exams_dir = exams_dir
+        self.cache_path = cache_path
+        self.index, self.passages = self.load()
+
+    def load(self):
+        files = exam_files(self.exams_dir)
+        key = (CACHE_VERSION, os.path.abspath(self.exams_dir), files)
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "rb") as f:
+                    cached_key, built = pickle.load(f)
+                if cached_key == key:
+                    return built
+            except Exception:
+                pass
+
+        built = build_index(self.exams_dir, files)
+        if self.cache_path:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "wb") as f:
+                pickle.dump((key, built), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return built
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index.values())
+
+    def get(self, date, provpass, question_number):
+        return self.index.get((date, provpass, question_number))
+
+    def answer(self, date, provpass, question_number):
+        question = self.get(date, provpass, question_number)
+        return question["answer"] if question else None
+
+    def text_only(self):
+        """Questions that can be answered without a figure."""
+        return [question for question in self if not is_visual(question)]
+
+
+@functools.lru_cache(maxsize=None)
+def get_repository(exams_dir=EXAMS_DIR):
+    """Process-wide shared repository, so every caller reuses the same scan."""
+    return ExamRepository(exams_dir)
@@ -0,0 +1,187 @@
+import functools
+import math
+import re
+from collections import Counter
+import numpy as np
+from exam_repository import get_repository
+
+# Retrieval of few-shot demonstrations. Every exam question is a TF-IDF vector of
+# character n-grams, stored as sparse CSR/CSC arrays; the similarities of a block of
+# queries to their subsection are one scatter-add over the posting lists, followed by
+# a vectorized top-k. Demonstrations come from the same subsection but never from the
+# target's own exam date.
+NGRAM_RANGE = (3, 5)
+# n-grams in more than this share of the questions carry no signal and have the
+# longest posting lists
+MAX_DF = 0.5
+QUERY_BLOCK = 256
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def question_text(item):
+    options = " ".join(str(v) for v in item.get("answers", {}).values() if v)
+    return f"{item.get('question', '')} {options}"
+
+
+def ngram_counts(text, ngram_range=NGRAM_RANGE):
+    text = f" {WHITESPACE_RE.sub(' ', text.lower()).strip()} "
+    low, high = ngram_range
+    return Counter(
+        text[i : i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)
+    )
+
+
+def tfidf_matrix(texts, max_df=MAX_DF):
+    """
+    L2-normalized sublinear TF-IDF rows as CSR arrays (indptr, indices, data), with
+    the vocabulary and idf fitted on texts.
+    """
+    counts = [ngram_counts(text) for text in texts]
+    df = Counter(gram for c in counts for gram in c)
+    limit = max(1, int(max_df * len(texts)))
+    vocabulary = {
+        gram: i for i, gram in enumerate(sorted(g for g, d in df.items() if d <= limit))
+    }
+    idf = np.empty(len(vocabulary), dtype=np.float32)
+    for gram, i in vocabulary.items():
+        idf[i] = math.log((1 + len(texts)) / (1 + df[gram])) + 1
+
+    indptr, indices, data = [0], [], []
+    for c in counts:
+        ids = [vocabulary[g] for g in c if g in vocabulary]
+        tfs = [c[g] for g in c if g in vocabulary]
+        indices.extend(ids)
+        data.extend(tfs)
+        indptr.append(len(indices))
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    data = (1 + np.log(np.asarray(data, dtype=np.float32))) * idf[indices]
+
+    # Row norms via a segmented sum over the CSR data
+    rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data**2, minlength=len(texts)))
+    data /= np.maximum(norms, 1e-12)[rows]
+    return (indptr, indices, data.astype(np.float32)), vocabulary, idf
+
+
+def to_csc(csr, n_features):
+    """The transpose of a CSR matrix, i.e. one posting list of (row, weight) per feature."""
+    indptr, indices, data = csr
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    col_indptr = np.zeros(n_features + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_features), out=col_indptr[1:])
+    return col_indptr, rows[order], data[order]
+
+
+def block_similarities(csr, start, end, csc, n_docs):
+    """Dense (end - start, n_docs) cosine similarities of CSR rows start:end to the corpus."""
+    indptr, indices, data = csr
+    col_indptr, col_rows, col_data = csc
+    lo, hi = indptr[start], indptr[end]
+    query = np.repeat(np.arange(end - start), np.diff(indptr[start : end + 1]))
+    features, weights = indices[lo:hi], data[lo:hi]
+
+    # Gather the posting list of every query feature in one shot
+    lengths = col_indptr[features + 1] - col_indptr[features]
+    total = int(lengths.sum())
+    segment_starts = np.cumsum(lengths) - lengths
+    positions = np.repeat(col_indptr[features] - segment_starts, lengths) + np.arange(
+        total
+    )
+    pair = np.repeat(query, lengths) * n_docs + col_rows[positions]
+    products = np.repeat(weights, lengths) * col_data[positions]
+    return np.bincount(
+        pair, weights=products, minlength=(end - start) * n_docs
+    ).reshape(end - start, n_docs)
+
+
+def top_k(scores, k):
+    """Column indices of the k largest finite scores per row, best first (-1 pads)."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.full((scores.shape[0], 0), -1)
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind="stable")
+    best = np.take_along_axis(best, order, axis=1)
+    return np.where(np.isfinite(np.take_along_axis(scores, best, axis=1)), best, -1)
+
+
+def csr_rows(csr, start, end):
+    """Rows start:end of a CSR matrix, as a CSR matrix of their own."""
+    indptr, indices, data = csr
+    lo, hi = indptr[start], indptr[end]
+    return indptr[start : end + 1] - lo, indices[lo:hi], data[lo:hi]
+
+
+class FewShotIndex:
+    """
+    Similarity index over exam questions, grouped by subsection so each question is
+    only scored against its own subsection. Questions without an answer or that depend
+    on a reading passage cannot serve as demonstrations, but can still be queried.
+    """
+
+    def __init__(self, questions):
+        # Sorted so that every subsection is a contiguous block of rows
+        self.questions = sorted(questions, key=lambda q: q.get("question_type", ""))
+        self.positions = {
+            (q["date"], q["provpass"], q.get("question_number")): i
+            for i, q in enumerate(self.questions)
+        }
+        self.csr, self.vocabulary, self.idf = tfidf_matrix(
+            [question_text(q) for q in self.questions]
+        )
+
+        subsections = [q.get("question_type", "") for q in self.questions]
+        _, starts = np.unique(subsections, return_index=True)
+        self.groups = list(zip(starts, list(starts[1:]) + [len(self.questions)]))
+        _, self.exam_ids = np.unique(
+            [q["date"] for q in self.questions], return_inverse=True
+        )
+        self.usable = np.array(
+            [bool(q.get("answer")) and not q.get("passage_id") for q in self.questions]
+        )
+        self._neighbours = {}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def neighbours(self, k):
+        """(len(self), k) positions of each question's demonstrations, -1 where missing."""
+        if k in self._neighbours:
+            return self._neighbours[k]
+        result = np.full((len(self.questions), k), -1, dtype=np.int64)
+        for group_start, group_end in self.groups:
+            group = csr_rows(self.csr, group_start, group_end)
+            size = group_end - group_start
+            csc = to_csc(group, len(self.vocabulary))
+            usable = self.usable[group_start:group_end]
+            exams = self.exam_ids[group_start:group_end]
+            for start in range(0, size, QUERY_BLOCK):
+                end = min(start + QUERY_BLOCK, size)
+                scores = block_similarities(group, start, end, csc, size)
+                allowed = usable[None, :] & (exams[start:end, None] != exams[None, :])
+                scores[~allowed] = -np.inf
+                best = top_k(scores, k)
+                rows = slice(group_start + start, group_start + end)
+                result[rows, : best.shape[1]] = np.where(
+                    best >= 0, best + group_start, -1
+                )
+        self._neighbours[k] = result
+        return result
+
+    def demonstrations(self, question, k):
+        """The k most similar usable questions from other exams, best first."""
+        position = self.positions.get(
+            (question["date"], question["provpass"], question.get("question_number"))
+        )
+        if position is None or k <= 0:
+            return []
+        return [self.questions[i] for i in self.neighbours(k)[position] if i >= 0]
+
+
+@functools.lru_cache(maxsize=None)
+def get_index(exams_dir="exams"):
+    """Index over the shared exam repository, built once per process."""
+    return FewShotIndex(get_repository(exams_dir))
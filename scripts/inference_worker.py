@@ -0,0 +1,168 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cpu_backend import BACKENDS
+from worker_client import DEFAULT_WORKER_URL
+
+
+class BatchQueue:
+    """
+    Collects generation requests from concurrent clients and hands them to a single
+    model thread in batches: the first waiting request opens a batch, which is then
+    filled with whatever else arrives within max_wait seconds, up to max_batch_size items.
+    """
+
+    def __init__(self, generate_fn, max_batch_size=16, max_wait=0.02):
+        self.generate_fn = generate_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, items):
+        request = {"items": items, "done": threading.Event()}
+        self.requests.put(request)
+        request["done"].wait()
+        if "error" in request:
+            raise RuntimeError(request["error"])
+        return request["generations"]
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        size = len(batch[0]["items"])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request["items"])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for request in batch for item in request["items"]]
+            try:
+                generations = self.generate_fn(items)
+            except Exception as e:
+                for request in batch:
+                    request["error"] = str(e)
+                    request["done"].set()
+                continue
+
+            offset = 0
+            for request in batch:
+                n = len(request["items"])
+                request["generations"] = generations[offset : offset + n]
+                offset += n
+                request["done"].set()
+
+
+def make_handler(model_name, batch_queue):
+    class WorkerHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"model": model_name})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                items = json.loads(self.rfile.read(length).decode("utf-8"))["items"]
+                generations = batch_queue.submit(items)
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"generations": generations})
+
+        def log_message(self, format, *args):
+            pass
+
+    return WorkerHandler
+
+
+def serve(
+    model_name,
+    host="127.0.0.1",
+    port=8765,
+    max_batch_size=16,
+    max_wait=0.02,
+    backend="auto",
+):
+    # Imported here so the module stays importable without torch/transformers
+    from evaluate_minilingua import load_model, local_generate_fn
+
+    tokenizer, generator = load_model(model_name, backend)
+
+    batch_queue = BatchQueue(
+        local_generate_fn(generator, tokenizer, batch_size=max_batch_size),
+        max_batch_size=max_batch_size,
+        max_wait=max_wait,
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(model_name, batch_queue))
+    print(f"Serving {model_name} on http://{host}:{port} (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    default_port = int(DEFAULT_WORKER_URL.rsplit(":", 1)[-1])
+    parser = argparse.ArgumentParser(
+        description="Keep a model loaded and serve generation requests on localhost"
+    )
+    parser.add_argument(
+        "--model_name", type=str, default="minilingua-ai/MiniLingua-1b-Instruct"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument(
+        "--max_batch_size",
+        type=int,
+        default=16,
+        help="Upper bound on items generated together",
+    )
+    parser.add_argument(
+        "--max_wait_ms",
+        type=float,
+        default=20,
+        help="How long an open batch waits for more requests",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    args = parser.parse_args()
+
+    serve(
+        args.model_name,
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        backend=args.backend,
+    )
+
+
+if __name__ == "__main__":
+    main()
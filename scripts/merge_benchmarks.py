@@ -1,142 +1,120 @@
-import json
-import os
-import glob
-from datasets import load_dataset
-from prompts import zero_shot_prompts
+import argparse
+import jsonio
+from benchmark_item import BenchmarkItem
+from exam_repository import get_repository, is_visual
+from instrumentation import pipeline_run, profiled, stage
+from passages import passages_path, save_passages
+from prompt_templates import (
+    DEFAULT_VARIANT,
+    PROMPT_VARIANTS,
+    get_template,
+    system_prompt,
+)
+from snapshots import load_snapshot
+
+OUTPUT_FILE = "merged_benchmark.jsonl"
 
 
 def get_system_prompt(options_count):
-    if options_count == 0:
-        return ""
-    letters = ["A", "B", "C", "D", "E"][:options_count]
-    prompt = "Du är en expert på att skriva högskoleprovet.\n\n"
-    for letter in letters:
-        prompt += f"- Om det rätta svaret är svarsalternativ {letter}, skriv bara ut {letter}\n"
-    if len(letters) > 1:
-        prompt += f"- Skriv bara ut {', '.join(letters[:-1])} eller {letters[-1]} - inget annat\n"
-    elif len(letters) == 1:
-        prompt += f"- Skriv bara ut {letters[0]} - inget annat\n"
-    return prompt
-
-
-def construct_prompt(subsection, question, options):
-    prompt_str = f"\n{subsection}\n"
-    instruction = zero_shot_prompts.get(subsection, "")
-    if instruction:
-        prompt_str += f"{instruction}\n\n"
-
-    prompt_str += f"{question}\n\n"
-    for letter, opt_text in options.items():
-        if opt_text:
-            prompt_str += f"{letter}: {opt_text}\n"
-    prompt_str += "\nSvar:\n"
-    return prompt_str
-
-
-def get_answer_key(facit_data, filename, question_number):
-    provpass_match = None
-    if "provpass-1" in filename:
-        provpass_match = "provpass-1"
-    elif "provpass-2" in filename:
-        provpass_match = "provpass-2"
-    elif "provpass-3" in filename:
-        provpass_match = "provpass-3"
-    elif "provpass-4" in filename:
-        provpass_match = "provpass-4"
-    elif "provpass-5" in filename:
-        provpass_match = "provpass-5"
-
-    if not provpass_match:
+    return system_prompt(options_count)
+
+
+def construct_prompt(
+    subsection, question, options, examples=(), variant=DEFAULT_VARIANT
+):
+    """
+    The user prompt of a question with options {letter: text}. Examples are solved
+    (question, options, answer) demonstrations, shown in the style of full_prompts.
+    """
+    letters = tuple(k for k, v in options.items() if v)
+    return get_template(subsection, letters, variant).render(
+        question, [options[k] for k in letters], examples
+    )
+
+
+def question_options(item):
+    return {
+        "A": item.get("answers", {}).get("a", ""),
+        "B": item.get("answers", {}).get("b", ""),
+        "C": item.get("answers", {}).get("c", ""),
+        "D": item.get("answers", {}).get("d", ""),
+        "E": item.get("answers", {}).get("e", ""),
+    }
+
+
+def swesat_item(item, demonstrations=(), variant=DEFAULT_VARIANT):
+    """
+    Benchmark item for one exam question, or None if it has no text options.
+    Demonstrations are solved exam questions shown as examples before the question.
+    """
+    q_num = item.get("question_number")
+    options_dict = question_options(item)
+    valid_options = {k: v for k, v in options_dict.items() if v}
+
+    if not valid_options:
         return None
 
-    return facit_data.get(provpass_match, {}).get(str(question_number))
+    subsection = item.get("question_type", "")
+    examples = []
+    for demo in demonstrations:
+        demo_options = question_options(demo)
+        if any(demo_options.values()):
+            examples.append((demo.get("question", ""), demo_options, demo["answer"]))
+    user_prompt = construct_prompt(
+        subsection, item.get("question", ""), valid_options, examples, variant
+    )
+
+    return BenchmarkItem(
+        uid=f"{item['date']}_{item['section']}_{subsection}_q-{q_num}",
+        test_id=item["date"],
+        section=item["section"],
+        subsection=subsection,
+        question_id=q_num,
+        question_resource=None,
+        question=item.get("question", ""),
+        option_a=options_dict["A"],
+        option_b=options_dict["B"],
+        option_c=options_dict["C"],
+        option_d=options_dict["D"],
+        option_e=options_dict["E"],
+        system_prompt=system_prompt(len(valid_options)),
+        prompt=user_prompt,
+        answer=item["answer"],
+        source="swesat",
+        passage_id=item.get("passage_id"),
+    )
 
 
-def load_swesat():
-    unified_items = []
-    base_dir = "exams"
+def swesat_items(questions, shots=0, variant=DEFAULT_VARIANT):
+    """
+    Items for the text-only questions, zero-shot or with the `shots` most similar
+    solved questions from other exam dates as demonstrations, with the instructions of
+    the given prompt variant.
+    """
+    questions = [item for item in questions if not is_visual(item)]
+    if shots:
+        # numpy is only needed for few-shot prompts
+        import few_shot
 
-    for date_dir in os.listdir(base_dir):
-        dir_path = os.path.join(base_dir, date_dir)
-        if not os.path.isdir(dir_path):
-            continue
+        index = few_shot.get_index()
+        items = (
+            swesat_item(item, index.demonstrations(item, shots), variant)
+            for item in questions
+        )
+    else:
+        items = (swesat_item(item, variant=variant) for item in questions)
+    return [item for item in items if item is not None]
 
-        facit_files = glob.glob(os.path.join(dir_path, "*facit*.json"))
-        facit_data = {}
-        if facit_files:
-            try:
-                with open(facit_files[0], "r", encoding="utf-8") as f:
-                    facit_data = json.load(f)
-            except Exception as e:
-                print(f"Failed to load facit {facit_files[0]}: {e}")
-
-        qa_files = [
-            f
-            for f in glob.glob(os.path.join(dir_path, "*.json"))
-            if "facit" not in f.lower()
-        ]
-        for qa_file in qa_files:
-            try:
-                with open(qa_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except Exception as e:
-                continue
-
-            for item in data:
-                # Skip visual questions
-                if (
-                    item.get("is_accompanied_with_visual") == "yes"
-                    or "visual required" in item.get("question", "").lower()
-                ):
-                    continue
-
-                q_num = item.get("question_number")
-                ans_key = get_answer_key(facit_data, os.path.basename(qa_file), q_num)
-
-                options_dict = {
-                    "A": item.get("answers", {}).get("a", ""),
-                    "B": item.get("answers", {}).get("b", ""),
-                    "C": item.get("answers", {}).get("c", ""),
-                    "D": item.get("answers", {}).get("d", ""),
-                    "E": item.get("answers", {}).get("e", ""),
-                }
-                valid_options = {k: v for k, v in options_dict.items() if v}
-
-                if not valid_options:
-                    continue
-
-                subsection = item.get("question_type", "")
-                system_prompt = get_system_prompt(len(valid_options))
-                user_prompt = construct_prompt(
-                    subsection, item.get("question", ""), valid_options
-                )
-
-                unified_item = {
-                    "uid": f"{date_dir}_{os.path.basename(qa_file).split('.')[0]}_{subsection}_q-{q_num}",
-                    "test_id": date_dir,
-                    "section": os.path.basename(qa_file).split(".")[0],
-                    "subsection": subsection,
-                    "question_id": q_num,
-                    "question_resource": None,
-                    "question": item.get("question", ""),
-                    "option_a": options_dict["A"],
-                    "option_b": options_dict["B"],
-                    "option_c": options_dict["C"],
-                    "option_d": options_dict["D"],
-                    "option_e": options_dict["E"],
-                    "system_prompt": system_prompt,
-                    "prompt": user_prompt,
-                    "answer": ans_key,
-                    "source": "swesat",
-                }
-                unified_items.append(unified_item)
 
-    return unified_items
+@profiled()
+def load_swesat(shots=0, variant=DEFAULT_VARIANT):
+    return swesat_items(get_repository(), shots, variant)
 
 
+@profiled()
 def load_skolprov():
-    print("Loading Swedish Skolprov from HF...")
-    skolprov_ds = load_dataset("Ekgren/swedish_skolprov", "all")
+    print("Loading Swedish Skolprov...")
+    skolprov_ds = load_snapshot("Ekgren/swedish_skolprov", "all")
     split_name = "train" if "train" in skolprov_ds else list(skolprov_ds.keys())[0]
 
     unified_items = []
@@ -145,32 +123,49 @@ def load_skolprov():
         if item.get("question_resource"):
             continue
 
-        unified_item = {
-            "uid": item.get("uid", ""),
-            "test_id": item.get("test_id", ""),
-            "section": item.get("section", ""),
-            "subsection": item.get("subsection", ""),
-            "question_id": item.get("question_id", ""),
-            "question_resource": item.get("question_resource", ""),
-            "question": item.get("question", ""),
-            "option_a": item.get("option_a", ""),
-            "option_b": item.get("option_b", ""),
-            "option_c": item.get("option_c", ""),
-            "option_d": item.get("option_d", ""),
-            "option_e": item.get("option_e", ""),
-            "system_prompt": item.get("system_prompt", ""),
-            "prompt": item.get("prompt", ""),
-            "answer": item.get("answer", ""),
-            "source": "skolprov",
-        }
+        unified_item = BenchmarkItem(
+            uid=item.get("uid", ""),
+            test_id=item.get("test_id", ""),
+            section=item.get("section", ""),
+            subsection=item.get("subsection", ""),
+            question_id=item.get("question_id", ""),
+            question_resource=item.get("question_resource", ""),
+            question=item.get("question", ""),
+            option_a=item.get("option_a", ""),
+            option_b=item.get("option_b", ""),
+            option_c=item.get("option_c", ""),
+            option_d=item.get("option_d", ""),
+            option_e=item.get("option_e", ""),
+            system_prompt=item.get("system_prompt", ""),
+            prompt=item.get("prompt", ""),
+            answer=item.get("answer", ""),
+            source="skolprov",
+        )
         unified_items.append(unified_item)
 
     return unified_items
 
 
-def merge():
+@profiled()
+def dedup(items, seen=None):
+    """
+    Drops items whose (prompt, answer, passage_id) signature is already in seen (updated
+    in place). Prompts that reference a passage are stored without its text, so the
+    passage_id tells apart questions with the same wording on different passages.
+    """
+    seen = set() if seen is None else seen
+    deduped = []
+    for item in items:
+        sig = (item.get("prompt", ""), item.get("answer", ""), item.get("passage_id"))
+        if sig not in seen:
+            seen.add(sig)
+            deduped.append(item)
+    return deduped
+
+
+def merge(output_file=OUTPUT_FILE, shots=0, variant=DEFAULT_VARIANT):
     print("Parsing local swesat exams...")
-    swesat_data = load_swesat()
+    swesat_data = load_swesat(shots, variant)
     print(f"Loaded {len(swesat_data)} valid text-only Swesat questions.")
 
     skolprov_data = load_skolprov()
@@ -178,27 +173,46 @@ def merge():
 
     combined = swesat_data + skolprov_data
 
-    # Deduplicate combined items by their prompt and answer
-    seen = set()
-    deduped = []
-    for item in combined:
-        sig = (item.get("prompt", ""), item.get("answer", ""))
-        if sig not in seen:
-            seen.add(sig)
-            deduped.append(item)
+    # Deduplicate combined items by their prompt, answer and passage
+    deduped = dedup(combined)
 
     print(f"Removed {len(combined) - len(deduped)} duplicate questions from overlap.")
     combined = deduped
 
-    output_file = "merged_benchmark.jsonl"
-    with open(output_file, "w", encoding="utf-8") as f:
-        for item in combined:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    with stage("write_jsonl") as record:
+        record["items"] = jsonio.write_jsonl(output_file, combined)
+
+    # Passages are stored once, next to the items that reference them
+    passages = get_repository().passages
+    used = {item["passage_id"] for item in combined if item.get("passage_id")}
+    save_passages({pid: passages[pid] for pid in used}, passages_path(output_file))
 
     print(
         f"\nSuccessfully merged {len(combined)} total questions with full prompt annotations into {output_file}."
     )
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Merge the local SweSAT exams and Skolprov into one JSONL benchmark"
+    )
+    parser.add_argument("--output", type=str, default=OUTPUT_FILE)
+    parser.add_argument(
+        "--shots",
+        type=int,
+        default=0,
+        help="Prepend the k most similar solved questions from other exams to SweSAT prompts",
+    )
+    parser.add_argument(
+        "--prompt_variant",
+        choices=sorted(PROMPT_VARIANTS),
+        default=DEFAULT_VARIANT,
+        help="Subsection instructions of the SweSAT prompts",
+    )
+    args = parser.parse_args(argv)
+    merge(args.output, shots=args.shots, variant=args.prompt_variant)
+
+
 if __name__ == "__main__":
-    merge()
+    with pipeline_run("merge_benchmarks"):
+        main()
@@ -0,0 +1,212 @@
+import argparse
+import jsonio
+import numpy as np
+
+
+def results_to_arrays(rows):
+    """Packs per-item result dicts into parallel NumPy arrays."""
+    rows = list(rows)
+    return {
+        "uid": np.array([str(r.get("uid", "")) for r in rows], dtype=object),
+        "source": np.array([r.get("source", "") for r in rows], dtype=object),
+        "subsection": np.array([r.get("subsection", "") for r in rows], dtype=object),
+        "correct": np.array([bool(r.get("correct")) for r in rows], dtype=bool),
+    }
+
+
+def load_results(path, model=None):
+    """
+    Loads a per-item results JSONL file (one {"uid", "source", "subsection", "correct", ...}
+    object per line) into parallel NumPy arrays, optionally keeping a single model's rows.
+    """
+    rows = jsonio.iter_jsonl(path)
+    if model:
+        rows = (row for row in rows if row.get("model") == model)
+    return results_to_arrays(rows)
+
+
+def save_results(rows, path):
+    jsonio.write_jsonl(path, rows)
+
+
+def factorize(labels):
+    """
+    Maps labels to integer codes with a dict pass; np.unique on object arrays sorts
+    Python strings and dominates the runtime on large result files.
+    """
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(label, len(index)) for label in labels),
+        dtype=np.int64,
+        count=len(labels),
+    )
+    groups = sorted(index)
+    remap = np.empty(len(groups), dtype=np.int64)
+    for new, group in enumerate(groups):
+        remap[index[group]] = new
+    return groups, remap[codes]
+
+
+def group_labels(results, by):
+    """Label of every row when grouping by "overall", "source" or "subsection"."""
+    if by == "overall":
+        return np.full(len(results["correct"]), "overall", dtype=object)
+    if by == "source":
+        return results["source"]
+    return np.array(
+        [
+            f"{source}/{subsection}"
+            for source, subsection in zip(results["source"], results["subsection"])
+        ],
+        dtype=object,
+    )
+
+
+def grouped_bootstrap(correct, labels, n_resamples=5000, alpha=0.05, seed=42):
+    """
+    Percentile bootstrap intervals for the accuracy of every group at once.
+
+    Resampling n binary outcomes with replacement leaves the number of correct items
+    Binomial(n, k / n)-distributed, so each resample is drawn directly from that
+    distribution instead of materialising n indices. This is exact for 0/1
+    correctness and costs O(groups x resamples) regardless of dataset size.
+    """
+    groups, inverse = factorize(labels)
+    n = np.bincount(inverse, minlength=len(groups))
+    k = np.bincount(inverse, weights=correct, minlength=len(groups))
+    acc = k / np.maximum(n, 1)
+
+    rng = np.random.default_rng(seed)
+    resampled = rng.binomial(n, acc, size=(n_resamples, len(groups))) / np.maximum(n, 1)
+    low, high = np.percentile(resampled, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+
+    return [
+        {
+            "group": str(groups[i]),
+            "n": int(n[i]),
+            "accuracy": float(acc[i]),
+            "ci_low": float(low[i]),
+            "ci_high": float(high[i]),
+        }
+        for i in range(len(groups))
+    ]
+
+
+def breakdown(results, n_resamples=5000, alpha=0.05, seed=42):
+    return {
+        by: grouped_bootstrap(
+            results["correct"], group_labels(results, by), n_resamples, alpha, seed
+        )
+        for by in ["overall", "source", "subsection"]
+    }
+
+
+def paired_comparison(results_a, results_b, by="subsection", n_resamples=5000, alpha=0.05, seed=42):
+    """
+    Paired bootstrap of the accuracy difference (A - B) over the items both runs share.
+
+    Per item the difference is -1, 0 or +1, so a paired resample only needs the counts
+    of the three outcomes: they are drawn from a multinomial for all groups at once.
+    The two-sided p-value is the bootstrap probability mass on the far side of zero.
+    """
+    positions = {uid: i for i, uid in enumerate(results_b["uid"])}
+    ia = np.array([i for i, uid in enumerate(results_a["uid"]) if uid in positions], dtype=np.int64)
+    ib = np.array([positions[uid] for uid in results_a["uid"][ia]], dtype=np.int64)
+    labels = group_labels(results_a, by)[ia]
+    a = results_a["correct"][ia]
+    b = results_b["correct"][ib]
+
+    groups, inverse = factorize(labels)
+    n = np.bincount(inverse, minlength=len(groups))
+    acc_a = np.bincount(inverse, weights=a, minlength=len(groups)) / np.maximum(n, 1)
+    acc_b = np.bincount(inverse, weights=b, minlength=len(groups)) / np.maximum(n, 1)
+    wins = np.bincount(inverse, weights=a & ~b, minlength=len(groups))
+    losses = np.bincount(inverse, weights=~a & b, minlength=len(groups))
+    denom = np.maximum(n, 1)
+    pvals = np.stack([losses / denom, 1 - (wins + losses) / denom, wins / denom], axis=1)
+
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(n, np.clip(pvals, 0, 1), size=(n_resamples, len(groups)))
+    diffs = (counts[..., 2] - counts[..., 0]) / denom
+    low, high = np.percentile(diffs, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    p_value = np.minimum(
+        1.0, 2 * np.minimum((diffs <= 0).mean(axis=0), (diffs >= 0).mean(axis=0))
+    )
+
+    return [
+        {
+            "group": str(groups[i]),
+            "n": int(n[i]),
+            "accuracy_a": float(acc_a[i]),
+            "accuracy_b": float(acc_b[i]),
+            "diff": float((wins[i] - losses[i]) / denom[i]),
+            "ci_low": float(low[i]),
+            "ci_high": float(high[i]),
+            "p_value": float(p_value[i]),
+        }
+        for i in range(len(groups))
+    ]
+
+
+def print_breakdown(report):
+    for by, rows in report.items():
+        print(f"\n{by.capitalize():<45} {'n':>7} {'acc':>7} {'95% CI':>17}")
+        for r in rows:
+            ci = f"[{r['ci_low'] * 100:5.1f}, {r['ci_high'] * 100:5.1f}]"
+            print(f"{r['group']:<45} {r['n']:>7} {r['accuracy'] * 100:6.1f}% {ci:>17}")
+
+
+def print_comparison(rows, by="subsection"):
+    print(f"\n{by.capitalize():<45} {'n':>7} {'A':>7} {'B':>7} {'A-B':>7} {'95% CI':>17} {'p':>7}")
+    for r in rows:
+        ci = f"[{r['ci_low'] * 100:+5.1f}, {r['ci_high'] * 100:+5.1f}]"
+        print(
+            f"{r['group']:<45} {r['n']:>7} {r['accuracy_a'] * 100:6.1f}% {r['accuracy_b'] * 100:6.1f}% "
+            f"{r['diff'] * 100:+6.1f} {ci:>17} {r['p_value']:7.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-source and per-subsection accuracy with bootstrap confidence intervals"
+    )
+    parser.add_argument("results", type=str, help="Per-item results JSONL of a run")
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="Results JSONL of a second run for paired significance tests",
+    )
+    parser.add_argument(
+        "--model", type=str, default=None, help="Only use rows of this model in results"
+    )
+    parser.add_argument(
+        "--compare_model",
+        type=str,
+        default=None,
+        help="Only use rows of this model in the compared results (defaults to results)",
+    )
+    parser.add_argument("--n_resamples", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = load_results(args.results, model=args.model)
+    print_breakdown(breakdown(results, n_resamples=args.n_resamples, seed=args.seed))
+
+    if args.compare or args.compare_model:
+        compare_file = args.compare or args.results
+        other = load_results(compare_file, model=args.compare_model)
+        print(
+            f"\nPaired comparison: A={args.model or args.results} B={args.compare_model or compare_file}"
+        )
+        for by in ["source", "subsection"]:
+            print_comparison(
+                paired_comparison(
+                    results, other, by=by, n_resamples=args.n_resamples, seed=args.seed
+                ),
+                by=by,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import RunRecorder
+
+# Producer/consumer stages around the model loop. Batches are prepared (formatted,
+# tokenized, collated) by a small thread pool ahead of the model, and finished batches
+# are handed to a consumer thread for scoring, so the model thread only runs the model.
+# Stall timings and queue depths are recorded to show which stage is the bottleneck:
+#   <name>_stall     the model waited for a prepared batch (preparation is too slow)
+#   <name>_depth     prepared batches ready when the model asked for one
+#   consume_stall    the model waited for room in the consumer queue (scoring is too slow)
+#   consume_depth    finished batches waiting to be scored
+
+
+def prefetch(fn, batches, workers=2, depth=4, recorder=None, name="prepare"):
+    """
+    Yields fn(batch) for every batch, in order, computing up to `depth` results ahead
+    on `workers` threads.
+    """
+    recorder = recorder or RunRecorder()
+    batches = iter(batches)
+    pending = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def fill():
+            while len(pending) < depth:
+                batch = next(batches, None)
+                if batch is None:
+                    return
+                pending.append(pool.submit(fn, batch))
+
+        fill()
+        while pending:
+            head = pending.pop(0)
+            recorder.sample(f"{name}_depth", sum(f.done() for f in [head] + pending))
+            started = time.perf_counter()
+            result = head.result()
+            recorder.record(f"{name}_stall", time.perf_counter() - started, started)
+            fill()
+            yield result
+
+
+class Consumer:
+    """
+    Runs handle(item) for every put() item on a thread of its own, in order. put() blocks
+    while `depth` items are waiting; close() waits for the rest and re-raises the first
+    error of handle.
+    """
+
+    def __init__(self, handle, depth=4, recorder=None):
+        self.handle = handle
+        self.recorder = recorder or RunRecorder()
+        self.items = queue.Queue(maxsize=depth)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.items.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                self.handle(item)
+            except BaseException as e:
+                self.error = e
+
+    def put(self, item):
+        if self.error is not None:
+            raise self.error
+        self.recorder.sample("consume_depth", self.items.qsize())
+        started = time.perf_counter()
+        self.items.put(item)
+        self.recorder.record("consume_stall", time.perf_counter() - started, started)
+
+    def close(self):
+        self.items.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Let the consumer drain without masking the original error
+            self.items.put(None)
@@ -0,0 +1,261 @@
+import argparse
+import os
+import sqlite3
+import time
+import jsonio
+
+# Per-item evaluation results of every run, in one SQLite file. Results are clustered
+# by (run_id, uid), so one run's rows are contiguous and two runs join item by item;
+# the secondary indexes cover the per-uid, per-model and per-subsection queries.
+STORE_PATH = os.environ.get("SWESAT_RESULTS_DB", "results.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    model TEXT,
+    created REAL,
+    dataset_file TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    model TEXT,
+    source TEXT,
+    subsection TEXT,
+    answer TEXT,
+    prediction TEXT,
+    correct INTEGER,
+    latency REAL,
+    prompt_tokens INTEGER,
+    generated_tokens INTEGER,
+    PRIMARY KEY (run_id, uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_uid ON results (uid);
+CREATE INDEX IF NOT EXISTS results_model ON results (model, subsection, correct);
+CREATE INDEX IF NOT EXISTS results_subsection ON results (subsection, correct);
+"""
+
+RESULT_COLUMNS = [
+    "run_id",
+    "uid",
+    "model",
+    "source",
+    "subsection",
+    "answer",
+    "prediction",
+    "correct",
+    "latency",
+    "prompt_tokens",
+    "generated_tokens",
+]
+
+
+def connect(path=STORE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def new_run_id(model_name=""):
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{model_name.split('/')[-1] or 'run'}"
+
+
+def record_run(db, rows, run_id, model_name="", dataset_file="", **metadata):
+    """Stores one run's per-item result rows, replacing any earlier rows of run_id."""
+    with db:
+        db.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+        db.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+            (run_id, model_name, time.time(), dataset_file, jsonio.dumps(metadata)),
+        )
+        db.executemany(
+            f"INSERT OR REPLACE INTO results ({', '.join(RESULT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(RESULT_COLUMNS))})",
+            (
+                (
+                    run_id,
+                    str(row.get("uid", "")),
+                    row.get("model") or model_name,
+                    row.get("source", ""),
+                    row.get("subsection", ""),
+                    str(row.get("answer", "")),
+                    row.get("prediction", ""),
+                    int(bool(row.get("correct"))),
+                    row.get("latency"),
+                    row.get("prompt_tokens"),
+                    row.get("generated_tokens"),
+                )
+                for row in rows
+            ),
+        )
+    return db.execute(
+        "SELECT COUNT(*) FROM results WHERE run_id = ?", (run_id,)
+    ).fetchone()[0]
+
+
+def store_results(rows, path=STORE_PATH, run_id=None, model_name="", **metadata):
+    """Opens the store, records rows as a run and returns the run id."""
+    run_id = run_id or new_run_id(model_name)
+    db = connect(path)
+    try:
+        record_run(db, rows, run_id, model_name, **metadata)
+    finally:
+        db.close()
+    return run_id
+
+
+def runs(db):
+    return db.execute("""
+        SELECT runs.run_id, runs.model, runs.created, COUNT(results.uid),
+               AVG(results.correct)
+        FROM runs LEFT JOIN results ON results.run_id = runs.run_id
+        GROUP BY runs.run_id ORDER BY runs.created
+        """).fetchall()
+
+
+def leaderboard(db, by_subsection=False):
+    """(model, [subsection,] items, accuracy) over all stored rows, best model first."""
+    if by_subsection:
+        return db.execute("""
+            SELECT model, subsection, COUNT(*), AVG(correct) FROM results
+            GROUP BY model, subsection ORDER BY subsection, AVG(correct) DESC
+            """).fetchall()
+    return db.execute("""
+        SELECT model, COUNT(*), AVG(correct) FROM results
+        GROUP BY model ORDER BY AVG(correct) DESC
+        """).fetchall()
+
+
+def regressions(db, run_a, run_b):
+    """
+    Per-subsection accuracy of run_b against run_a over the items both runs answered,
+    largest drop first: (subsection, items, accuracy_a, accuracy_b, lost, gained).
+    """
+    return db.execute(
+        """
+        SELECT a.subsection, COUNT(*), AVG(a.correct), AVG(b.correct),
+               SUM(a.correct > b.correct), SUM(a.correct < b.correct)
+        FROM results a JOIN results b ON b.run_id = ? AND b.uid = a.uid
+        WHERE a.run_id = ?
+        GROUP BY a.subsection ORDER BY AVG(b.correct) - AVG(a.correct)
+        """,
+        (run_b, run_a),
+    ).fetchall()
+
+
+def item_diff(db, run_a, run_b, limit=None):
+    """Items whose correctness differs between the runs: (uid, subsection, answer, a, b)."""
+    query = """
+        SELECT a.uid, a.subsection, a.answer, a.prediction, a.correct,
+               b.prediction, b.correct
+        FROM results a JOIN results b ON b.run_id = ? AND b.uid = a.uid
+        WHERE a.run_id = ? AND a.correct != b.correct
+        ORDER BY a.subsection, a.uid
+    """
+    params = (run_b, run_a)
+    if limit:
+        query += " LIMIT ?"
+        params += (limit,)
+    return db.execute(query, params).fetchall()
+
+
+def print_runs(rows):
+    print(f"\n{'Run':<40} {'Model':<40} {'items':>8} {'acc':>7}")
+    for run_id, model, _, n, acc in rows:
+        print(f"{run_id:<40} {model or '':<40} {n:>8} {(acc or 0) * 100:6.1f}%")
+
+
+def print_leaderboard(rows, by_subsection=False):
+    if by_subsection:
+        print(f"\n{'Subsection':<28} {'Model':<40} {'items':>8} {'acc':>7}")
+        for model, subsection, n, acc in rows:
+            print(f"{subsection:<28} {model:<40} {n:>8} {acc * 100:6.1f}%")
+        return
+    print(f"\n{'#':>3} {'Model':<40} {'items':>8} {'acc':>7}")
+    for rank, (model, n, acc) in enumerate(rows, 1):
+        print(f"{rank:>3} {model:<40} {n:>8} {acc * 100:6.1f}%")
+
+
+def print_regressions(rows):
+    print(
+        f"\n{'Subsection':<28} {'items':>8} {'A':>7} {'B':>7} {'B-A':>7} {'lost':>6} {'gained':>7}"
+    )
+    for subsection, n, acc_a, acc_b, lost, gained in rows:
+        print(
+            f"{subsection:<28} {n:>8} {acc_a * 100:6.1f}% {acc_b * 100:6.1f}% "
+            f"{(acc_b - acc_a) * 100:+6.1f} {lost:>6} {gained:>7}"
+        )
+
+
+def print_item_diff(rows):
+    print(f"\n{'uid':<50} {'answer':>6}  {'A':<12} {'B':<12}")
+    for uid, _, answer, pred_a, correct_a, pred_b, correct_b in rows:
+        mark_a = "ok" if correct_a else "x"
+        mark_b = "ok" if correct_b else "x"
+        print(
+            f"{uid:<50} {answer:>6}  {mark_a:<3}{(pred_a or '')[:8]:<9} "
+            f"{mark_b:<3}{(pred_b or '')[:8]:<9}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Store per-item evaluation results and compare runs"
+    )
+    parser.add_argument("--db", type=str, default=STORE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Store a per-item results JSONL file")
+    ingest.add_argument("results", type=str)
+    ingest.add_argument("--run_id", type=str, default=None)
+    ingest.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="Only store rows of this model (one run per model by default)",
+    )
+    sub.add_parser("runs", help="List the stored runs")
+    board = sub.add_parser("leaderboard", help="Accuracy per model")
+    board.add_argument("--by_subsection", action="store_true")
+    regress = sub.add_parser(
+        "regressions", help="Per-subsection accuracy change from run A to run B"
+    )
+    regress.add_argument("run_a", type=str)
+    regress.add_argument("run_b", type=str)
+    diff = sub.add_parser("diff", help="Items answered differently by run A and run B")
+    diff.add_argument("run_a", type=str)
+    diff.add_argument("run_b", type=str)
+    diff.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    db = connect(args.db)
+    if args.command == "ingest":
+        by_model = {}
+        for row in jsonio.iter_jsonl(args.results):
+            if args.model is None or row.get("model") == args.model:
+                by_model.setdefault(row.get("model", ""), []).append(row)
+        for model_name, rows in by_model.items():
+            run_id = args.run_id or new_run_id(model_name)
+            if args.run_id and len(by_model) > 1:
+                run_id = f"{args.run_id}-{model_name.split('/')[-1]}"
+            n = record_run(db, rows, run_id, model_name, dataset_file=args.results)
+            print(f"Stored {n} results as run {run_id}.")
+    elif args.command == "runs":
+        print_runs(runs(db))
+    elif args.command == "leaderboard":
+        print_leaderboard(leaderboard(db, args.by_subsection), args.by_subsection)
+    elif args.command == "regressions":
+        print(f"\nA={args.run_a} B={args.run_b}")
+        print_regressions(regressions(db, args.run_a, args.run_b))
+    elif args.command == "diff":
+        rows = item_diff(db, args.run_a, args.run_b, args.limit)
+        print_item_diff(rows)
+        print(f"\n{len(rows)} items differ.")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
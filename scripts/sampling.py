@@ -0,0 +1,104 @@
+import random
+import jsonio
+from benchmark_item import BenchmarkItem
+from passages import load_passages, materialize, passages_path
+from prompt_templates import rerender
+
+
+def iter_jsonl(path, prompt_variant=None):
+    """
+    Stream items from a JSONL file one at a time, with prompts that reference a reading
+    passage materialized from the file's passages table. With a prompt_variant, SweSAT
+    prompts are re-rendered with that variant's instructions.
+    """
+    table_path = passages_path(path)
+    passages = load_passages(table_path)
+    for row in jsonio.iter_jsonl(path):
+        item = BenchmarkItem.from_dict(row)
+        if prompt_variant:
+            item = rerender(item, prompt_variant)
+        yield materialize(item, passages, table_path)
+
+
+def stratum_key(item):
+    return (item.get("source", ""), item.get("subsection", ""))
+
+
+def filter_tasks(items, tasks):
+    """
+    Keeps items whose source or "source/subsection" is listed in tasks
+    (e.g. ["swesat", "superlim-2/swefaq"]). An empty task list keeps everything.
+    """
+    tasks = set(tasks or [])
+    for item in items:
+        source, subsection = stratum_key(item)
+        if not tasks or source in tasks or f"{source}/{subsection}" in tasks:
+            yield item
+
+
+def parse_quotas(specs):
+    """
+    Parses quota overrides of the form "source/subsection=N" (e.g. "swesat/NOG=20")
+    into a dict keyed by stratum.
+    """
+    quotas = {}
+    for spec in specs or []:
+        stratum, _, count = spec.rpartition("=")
+        source, _, subsection = stratum.partition("/")
+        quotas[(source, subsection)] = int(count)
+    return quotas
+
+
+def stratified_reservoir_sample(items, per_stratum=5, quotas=None, seed=42):
+    """
+    Single-pass stratified sampling over an iterable of benchmark items.
+    Keeps one reservoir (Algorithm R) per (source, subsection) stratum, so memory is
+    bounded by the sum of the quotas rather than by the size of the dataset.
+    Every stratum gets its own RNG derived from the seed, so the items drawn for one
+    stratum do not change when rows of another stratum are added or removed.
+
+    Returns (reservoirs, seen) where reservoirs maps stratum -> sampled items and
+    seen maps stratum -> number of items streamed for it.
+    """
+    quotas = quotas or {}
+    reservoirs = {}
+    rngs = {}
+    seen = {}
+
+    for item in items:
+        key = stratum_key(item)
+        quota = quotas.get(key, per_stratum)
+        if quota <= 0:
+            continue
+
+        n = seen.get(key, 0) + 1
+        seen[key] = n
+        reservoir = reservoirs.setdefault(key, [])
+        if len(reservoir) < quota:
+            reservoir.append(item)
+            continue
+
+        if key not in rngs:
+            rngs[key] = random.Random(f"{seed}-{key[0]}-{key[1]}")
+        j = rngs[key].randrange(n)
+        if j < quota:
+            reservoir[j] = item
+
+    return {k: reservoirs[k] for k in sorted(reservoirs)}, seen
+
+
+def stratified_sample(
+    path, per_stratum=5, quotas=None, seed=42, tasks=None, prompt_variant=None
+):
+    """Draws a stratified evaluation subset from a JSONL file without loading it."""
+    reservoirs, seen = stratified_reservoir_sample(
+        filter_tasks(iter_jsonl(path, prompt_variant), tasks),
+        per_stratum=per_stratum,
+        quotas=quotas,
+        seed=seed,
+    )
+    for (source, subsection), reservoir in reservoirs.items():
+        print(
+            f"  {source}/{subsection}: sampled {len(reservoir)} of {seen[(source, subsection)]}"
+        )
+    return [item for reservoir in reservoirs.values() for item in reservoir]
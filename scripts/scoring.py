@@ -0,0 +1,320 @@
+import argparse
+import functools
+import re
+import jsonio
+import numpy as np
+from add_superlim import LABEL_MAP
+from metrics import factorize
+
+# Answer extraction and scoring. Every item is scored by the matcher of its task type,
+# compiled once: the answer letter of multiple-choice items, a label of the SuperLim
+# classification tasks (Swedish or English), a number on the scale of the rating tasks
+# or the answer word of sweanalogy. An output the matcher cannot read is unparseable,
+# which is counted apart from wrong answers.
+LETTERS = ["A", "B", "C", "D", "E"]
+
+# Rating tasks: the scale's bounds, and how far a prediction may be from the gold score
+SCALE_TASKS = {"absabank-imm": (1.0, 5.0), "sweparaphrase": (0.0, 5.0)}
+SCALE_TOLERANCE = 0.5
+TOKEN_TASKS = {"sweanalogy"}
+
+# Labels of the classification tasks, as the merged benchmark writes them (LABEL_MAP
+# values, or the raw SuperLim label where LABEL_MAP has none)
+NLI_LABELS = ["Entailment", "Neutral", "Motsägelse"]
+TASK_LABELS = {
+    "argumentation-sentences": ["pro", "con", "non"],
+    "dalaj-ged-superlim": ["Korrekt", "Inkorrekt"],
+    "swediagnostics": NLI_LABELS,
+    "swenli": NLI_LABELS,
+    "swewinogender": NLI_LABELS,
+    "swewic": ["Samma betydelse", "Annan betydelse"],
+    "swewinograd": ["Korefererande", "not_coreferring"],
+}
+
+# Further ways of writing a label, besides the label itself and its LABEL_MAP key
+LABEL_SYNONYMS = {
+    "pro": ["för", "argument för", "stödjer", "in favour", "in favor", "supports"],
+    "con": ["emot", "argument emot", "motsätter", "against", "opposes"],
+    "non": [
+        "orelaterad",
+        "orelaterat",
+        "irrelevant",
+        "unrelated",
+        "inget argument",
+        "no argument",
+    ],
+    "Korrekt": ["grammatisk", "grammatical", "grammatiskt korrekt"],
+    "Inkorrekt": ["felaktig", "ogrammatisk", "ungrammatical"],
+    "Entailment": ["medför", "implicerar", "entails", "implikation"],
+    "Neutral": ["neutralt"],
+    "Motsägelse": ["motsäger", "contradicts", "kontradiktion"],
+    "Korefererande": ["coreferent", "koreferent"],
+    "not_coreferring": ["not coreferent"],
+    "Samma betydelse": ["same meaning", "samma"],
+    "Annan betydelse": ["different meaning", "olika betydelse", "olika", "annan"],
+}
+
+# A negated label ("inte samma", "not correct") reads as the opposite label of its
+# two-label task; other negated labels are skipped
+NEGATION_RE = r"(?P<negation>(?:inte|ej|icke|not)[\s_-]+)?"
+OPPOSITE_LABELS = {
+    "Korrekt": "Inkorrekt",
+    "Inkorrekt": "Korrekt",
+    "Samma betydelse": "Annan betydelse",
+    "Annan betydelse": "Samma betydelse",
+    "Korefererande": "not_coreferring",
+    "not_coreferring": "Korefererande",
+}
+SEPARATOR_RE = re.compile(r"[\s_-]+")
+LETTER_RE = re.compile(r"(?<!\w)([A-E])(?!\w)")
+LONE_LETTER_RE = re.compile(r"^\W*([a-e])\W*$", re.IGNORECASE)
+NUMBER_RE = re.compile(r"(?<![\w.,])(\d+(?:[.,]\d+)?)(?!\w)")
+WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+
+def normalize(text):
+    return SEPARATOR_RE.sub(" ", str(text).casefold()).strip()
+
+
+def answer_text(generated_text):
+    """The part of a generation after its last "Svar:", where the answer is."""
+    generated_text = (generated_text or "").strip()
+    if "Svar:" in generated_text:
+        generated_text = generated_text.split("Svar:")[-1].strip()
+    return generated_text
+
+
+def as_number(text):
+    try:
+        return float(str(text).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def task_key(subsection, answer):
+    """The matcher an item is scored with, as a hashable (kind, parameters) key."""
+    if subsection in SCALE_TASKS and as_number(answer) is not None:
+        return ("scale", SCALE_TASKS[subsection])
+    if subsection in TOKEN_TASKS:
+        return ("token", None)
+    if answer in LETTERS:
+        return ("choice", None)
+    return ("label", tuple(sorted(set(TASK_LABELS.get(subsection, [])) | {answer})))
+
+
+def label_synonyms(label):
+    english = [key for key, value in LABEL_MAP.items() if value == label]
+    return [label] + english + LABEL_SYNONYMS.get(label, [])
+
+
+def letter_matcher():
+    def parse(text):
+        match = LETTER_RE.search(text)
+        if match is None:
+            # A lone lowercase letter, such as "b" or "c)"
+            match = LONE_LETTER_RE.match(text)
+        return match.group(1).upper() if match else None
+
+    return parse
+
+
+def label_matcher(labels):
+    table = {normalize(s): label for label in labels for s in label_synonyms(label)}
+    # Longest first, so that a synonym wins over any shorter synonym it starts with
+    phrases = sorted(table, key=len, reverse=True)
+    pattern = re.compile(
+        rf"(?<!\w){NEGATION_RE}(?P<label>"
+        + "|".join(r"[\s_-]+".join(map(re.escape, p.split(" "))) for p in phrases)
+        + r")(?!\w)",
+        re.IGNORECASE,
+    )
+
+    def parse(text):
+        for match in pattern.finditer(text):
+            label = table[normalize(match.group("label"))]
+            if match.group("negation"):
+                # Labels such as "not_coreferring" start with a negation themselves
+                label = table.get(normalize(match.group(0))) or OPPOSITE_LABELS.get(
+                    label
+                )
+                if label not in labels:
+                    continue
+            return label
+        return None
+
+    return parse
+
+
+def scale_matcher(bounds):
+    low, high = bounds
+
+    def parse(text):
+        for match in NUMBER_RE.finditer(text):
+            value = as_number(match.group(1))
+            if low <= value <= high:
+                return value
+        return None
+
+    return parse
+
+
+def token_matcher():
+    def parse(text):
+        # "kung:drottning = man:kvinna" and "D: kvinna" both end with the answer
+        text = text.rsplit("=", 1)[-1].rsplit(":", 1)[-1]
+        match = WORD_RE.search(text)
+        return match.group(0).casefold() if match else None
+
+    return parse
+
+
+@functools.lru_cache(maxsize=None)
+def get_matcher(key):
+    """The compiled parser of a task_key: generation text -> answer, or None."""
+    kind, params = key
+    if kind == "choice":
+        return letter_matcher()
+    if kind == "label":
+        return label_matcher(params)
+    if kind == "scale":
+        return scale_matcher(params)
+    return token_matcher()
+
+
+def gold_answers(key, answers):
+    kind = key[0]
+    if kind == "scale":
+        return np.array([as_number(a) for a in answers], dtype=float)
+    if kind == "token":
+        return np.array([a.casefold() for a in answers], dtype=object)
+    return np.array(answers, dtype=object)
+
+
+def compare(key, parsed, gold):
+    """Correctness of parsed answers (None where unparseable) against gold answers."""
+    if key[0] == "scale":
+        values = np.array([np.nan if p is None else p for p in parsed], dtype=float)
+        with np.errstate(invalid="ignore"):
+            return np.abs(values - gold) <= SCALE_TOLERANCE
+    return np.array(parsed, dtype=object) == gold
+
+
+def score(item, generated_text):
+    """(parsed answer or None, correct) of one generation."""
+    answer = str(item.get("answer", "")).strip()
+    key = task_key(item.get("subsection", ""), answer)
+    parsed = get_matcher(key)(answer_text(generated_text))
+    return parsed, bool(compare(key, [parsed], gold_answers(key, [answer]))[0])
+
+
+def is_correct(item, generated_text):
+    return score(item, generated_text)[1]
+
+
+def score_results(rows):
+    """
+    Scores the "prediction" of every result row against its "answer". Rows are grouped
+    by matcher, so each group runs one compiled parser and one array comparison.
+    Returns parallel arrays: parsed (None where unparseable), parseable and correct.
+    """
+    rows = list(rows)
+    answers = [str(row.get("answer", "")).strip() for row in rows]
+    keys = [task_key(row.get("subsection", ""), a) for row, a in zip(rows, answers)]
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+
+    parsed = np.full(len(rows), None, dtype=object)
+    correct = np.zeros(len(rows), dtype=bool)
+    for key, positions in groups.items():
+        parse = get_matcher(key)
+        values = [parse(answer_text(rows[i].get("prediction"))) for i in positions]
+        positions = np.array(positions, dtype=np.int64)
+        parsed[positions] = values
+        correct[positions] = compare(
+            key, values, gold_answers(key, [answers[i] for i in positions])
+        )
+    return {
+        "parsed": parsed,
+        "parseable": np.array([p is not None for p in parsed], dtype=bool),
+        "correct": correct,
+    }
+
+
+def scoring_summary(rows, scores):
+    """
+    Per-subsection and overall items, accuracy, unparseable outputs and the accuracy
+    over the parseable outputs.
+    """
+    if not len(rows):
+        return []
+    groups, inverse = factorize(
+        [f"{r.get('source', '')}/{r.get('subsection', '')}" for r in rows]
+    )
+    n = np.bincount(inverse, minlength=len(groups))
+    hits = np.bincount(inverse, weights=scores["correct"], minlength=len(groups))
+    parsed = np.bincount(inverse, weights=scores["parseable"], minlength=len(groups))
+    totals = [("all", n.sum(), hits.sum(), parsed.sum())]
+    return [
+        {
+            "group": group,
+            "n": int(count),
+            "accuracy": float(correct / count),
+            "unparseable": int(count - parseable),
+            "parsed_accuracy": float(correct / parseable) if parseable else 0.0,
+        }
+        for group, count, correct, parseable in list(zip(groups, n, hits, parsed))
+        + totals
+    ]
+
+
+def print_scoring_summary(summary):
+    print(
+        f"\n{'Subsection':<45} {'n':>7} {'acc':>7} {'unparsed':>9} {'acc/parsed':>11}"
+    )
+    for r in summary:
+        print(
+            f"{r['group']:<45} {r['n']:>7} {r['accuracy'] * 100:6.1f}% "
+            f"{r['unparseable']:>9} {r['parsed_accuracy'] * 100:10.1f}%"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-score a per-item results file with the task-aware answer matchers"
+    )
+    parser.add_argument("results", type=str, help="Per-item results JSONL of a run")
+    parser.add_argument(
+        "--model", type=str, default=None, help="Only score rows of this model"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Write the rows with the new verdicts and parsed answers to this JSONL file",
+    )
+    args = parser.parse_args(argv)
+
+    rows = jsonio.iter_jsonl(args.results)
+    if args.model:
+        rows = (row for row in rows if row.get("model") == args.model)
+    rows = list(rows)
+    scores = score_results(rows)
+    print_scoring_summary(scoring_summary(rows, scores))
+    changed = sum(
+        bool(row.get("correct")) != verdict
+        for row, verdict in zip(rows, scores["correct"])
+    )
+    print(f"\n{changed} of {len(rows)} verdicts differ from the stored ones.")
+
+    if args.output:
+        rescored = [
+            {**row, "parsed": parsed, "correct": bool(verdict)}
+            for row, parsed, verdict in zip(rows, scores["parsed"], scores["correct"])
+        ]
+        jsonio.write_jsonl(args.output, rescored)
+        print(f"Saved {len(rescored)} re-scored rows to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
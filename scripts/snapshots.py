@@ -0,0 +1,170 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+import time
+
+SNAPSHOT_DIR = os.environ.get("SWESAT_SNAPSHOT_DIR", "snapshots")
+
+# Hub datasets the build pulls from; None means every config of the dataset
+SOURCES = {
+    "skolprov": ("Ekgren/swedish_skolprov", ["all"]),
+    "superlim": ("sbx/superlim-2", None),
+}
+
+
+def manifest_path():
+    return os.path.join(SNAPSHOT_DIR, "manifest.json")
+
+
+@functools.lru_cache(maxsize=None)
+def load_manifest():
+    if not os.path.exists(manifest_path()):
+        return {}
+    with open(manifest_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(manifest_path(), "w", encoding="utf-8") as f:
+        f.write(json.dumps(manifest, ensure_ascii=False, indent=4))
+    load_manifest.cache_clear()
+
+
+def directory_checksum(path):
+    """sha256 over the relative names and contents of every file below path."""
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hub_revision(repo_id):
+    try:
+        from huggingface_hub import HfApi
+
+        return HfApi().dataset_info(repo_id).sha
+    except Exception:
+        return "unknown"
+
+
+def snapshot_source(repo_id, configs=None):
+    """
+    Downloads every split of the given configs once and stores them as Arrow files under
+    snapshots/<repo_id>/<revision>/<config>, recording revision, row counts and checksums
+    in snapshots/manifest.json.
+    """
+    from datasets import get_dataset_config_names, load_dataset
+
+    revision = hub_revision(repo_id)
+    # Every config is pulled at the recorded revision, unless the Hub did not report one
+    pinned = None if revision == "unknown" else revision
+    configs = configs or get_dataset_config_names(repo_id, revision=pinned)
+    entry = {"revision": revision, "pulled": time.time(), "configs": {}}
+
+    for conf in configs:
+        print(f"Snapshotting {repo_id} [{conf}] @ {revision[:12]}...")
+        try:
+            ds = load_dataset(repo_id, conf, revision=pinned)
+        except Exception as e:
+            print(f"  -> Skipped {conf}: {e}")
+            continue
+        rel_path = os.path.join(repo_id, revision[:12], conf)
+        ds.save_to_disk(os.path.join(SNAPSHOT_DIR, rel_path))
+        entry["configs"][conf] = {
+            "path": rel_path,
+            "splits": {split: ds[split].num_rows for split in ds},
+            "sha256": directory_checksum(os.path.join(SNAPSHOT_DIR, rel_path)),
+        }
+
+    manifest = dict(load_manifest())
+    manifest[repo_id] = entry
+    save_manifest(manifest)
+    return entry
+
+
+def snapshot_config_names(repo_id):
+    """Config names from the snapshot manifest, or from the Hub if not snapshotted."""
+    entry = load_manifest().get(repo_id)
+    if entry:
+        return list(entry["configs"])
+    from datasets import get_dataset_config_names
+
+    return get_dataset_config_names(repo_id)
+
+
+def load_snapshot(repo_id, config, split=None):
+    """
+    Loads a dataset config from the local snapshot store (memory-mapped Arrow, so cold
+    starts take milliseconds), falling back to the Hub when it has not been snapshotted.
+    Raises KeyError for a split the snapshot does not contain, like load_dataset does.
+    """
+    # datasets is imported lazily: it takes about a second and is not needed by
+    # callers that only read the manifest
+    from datasets import load_dataset, load_from_disk
+
+    entry = load_manifest().get(repo_id, {}).get("configs", {}).get(config)
+    if entry is None:
+        print(
+            f"No local snapshot of {repo_id} [{config}]; loading from the Hub. "
+            f"Run `python scripts/snapshots.py pull` to work offline."
+        )
+        return load_dataset(repo_id, config, split=split)
+
+    ds = load_from_disk(os.path.join(SNAPSHOT_DIR, entry["path"]))
+    return ds[split] if split else ds
+
+
+def init_progress_lock():
+    """
+    Creates tqdm's class-level lock. load_from_disk() and Dataset.map() create progress
+    bars, and tqdm creates its lock lazily with a check-then-set that is not
+    thread-safe, so callers loading configs from a thread pool call this on the main
+    thread before starting it.
+    """
+    from tqdm import tqdm
+
+    tqdm.get_lock()
+
+
+def verify():
+    ok = True
+    for repo_id, entry in load_manifest().items():
+        for conf, info in entry["configs"].items():
+            path = os.path.join(SNAPSHOT_DIR, info["path"])
+            valid = os.path.isdir(path) and directory_checksum(path) == info["sha256"]
+            ok = ok and valid
+            print(f"{'OK ' if valid else 'BAD'} {repo_id} [{conf}] {info['splits']}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Manage local snapshots of the Hub datasets used by the build"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    pull = sub.add_parser("pull", help="Download sources into the snapshot store")
+    pull.add_argument(
+        "--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES)
+    )
+    sub.add_parser("verify", help="Check snapshot checksums against the manifest")
+    args = parser.parse_args(argv)
+
+    if args.command == "pull":
+        for source in args.sources:
+            repo_id, configs = SOURCES[source]
+            snapshot_source(repo_id, configs)
+        print(f"Manifest written to {manifest_path()}")
+    elif args.command == "verify":
+        raise SystemExit(0 if verify() else 1)
+
+
+if __name__ == "__main__":
+    main()
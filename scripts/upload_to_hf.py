@@ -1,16 +1,193 @@
 import os
 import argparse
-from datasets import load_dataset
+import hashlib
+import re
+import shutil
+import jsonio
+from instrumentation import pipeline_run, stage
+from sampling import iter_jsonl
 
+SHARD_DIR = "data"
+MANIFEST_FILE = "manifest.json"
 
-def main():
+
+def shard_group(item):
+    """Items of one source unit share shards, so a change stays local to its group."""
+    group = (
+        f"{item.get('source', '')}-{item.get('test_id') or item.get('subsection', '')}"
+    )
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", group)
+
+
+def export_shards(dataset_file, export_dir, max_shard_bytes=20 * 1024**2):
+    """
+    Writes the dataset as deterministic JSONL shards, export_dir/data/train-<group>-<n>.jsonl,
+    each at most max_shard_bytes, and a manifest of their sha256 hashes. Passages are
+    inlined into the prompts, so the published copy is self-contained.
+    """
+    groups = {}
+    for item in iter_jsonl(dataset_file):
+        row = item.to_dict()
+        row.pop("passage_id", None)
+        line = (jsonio.dumps(row) + "\n").encode("utf-8")
+        groups.setdefault(shard_group(item), []).append(line)
+
+    shard_root = os.path.join(export_dir, SHARD_DIR)
+    shutil.rmtree(shard_root, ignore_errors=True)
+    os.makedirs(shard_root)
+
+    shards = {}
+
+    def flush(group, index, lines):
+        path = f"{SHARD_DIR}/train-{group}-{index:05d}.jsonl"
+        data = b"".join(lines)
+        with open(os.path.join(export_dir, path), "wb") as f:
+            f.write(data)
+        shards[path] = {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "bytes": len(data),
+            "rows": len(lines),
+        }
+
+    for group in sorted(groups):
+        index, lines, size = 0, [], 0
+        for line in groups[group]:
+            if lines and size + len(line) > max_shard_bytes:
+                flush(group, index, lines)
+                index, lines, size = index + 1, [], 0
+            lines.append(line)
+            size += len(line)
+        flush(group, index, lines)
+
+    manifest = {"shards": shards, "rows": sum(s["rows"] for s in shards.values())}
+    jsonio.write_json(os.path.join(export_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+
+def diff_manifests(old, new):
+    """Returns (paths to upload, paths to delete) to turn the old shard set into the new."""
+    old_shards = (old or {}).get("shards", {})
+    new_shards = new.get("shards", {})
+    upload = sorted(
+        path
+        for path, info in new_shards.items()
+        if old_shards.get(path, {}).get("sha256") != info["sha256"]
+    )
+    delete = sorted(path for path in old_shards if path not in new_shards)
+    return upload, delete
+
+
+class LocalRemote:
+    """A directory standing in for the published dataset repository."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def __str__(self):
+        return self.root
+
+    def read_manifest(self):
+        path = os.path.join(self.root, MANIFEST_FILE)
+        return jsonio.read_json(path) if os.path.exists(path) else None
+
+    def list_shards(self):
+        shard_root = os.path.join(self.root, SHARD_DIR)
+        if not os.path.isdir(shard_root):
+            return []
+        return [f"{SHARD_DIR}/{name}" for name in os.listdir(shard_root)]
+
+    def apply(self, export_dir, upload, delete, message):
+        os.makedirs(os.path.join(self.root, SHARD_DIR), exist_ok=True)
+        for path in upload + [MANIFEST_FILE]:
+            shutil.copyfile(
+                os.path.join(export_dir, path), os.path.join(self.root, path)
+            )
+        for path in delete:
+            os.remove(os.path.join(self.root, path))
+
+
+class HubRemote:
+    """A dataset repository on the Hugging Face Hub; changes land in a single commit."""
+
+    def __init__(self, repo_id, token=None):
+        from huggingface_hub import HfApi
+
+        self.repo_id = repo_id
+        self.api = HfApi(token=token)
+        self.api.create_repo(repo_id, repo_type="dataset", exist_ok=True)
+
+    def __str__(self):
+        return f"{self.repo_id} on Hugging Face Hub"
+
+    def read_manifest(self):
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+
+        try:
+            path = hf_hub_download(
+                self.repo_id,
+                MANIFEST_FILE,
+                repo_type="dataset",
+                token=self.api.token,
+            )
+        except EntryNotFoundError:
+            return None
+        return jsonio.read_json(path)
+
+    def list_shards(self):
+        files = self.api.list_repo_files(self.repo_id, repo_type="dataset")
+        return [path for path in files if path.startswith(f"{SHARD_DIR}/")]
+
+    def apply(self, export_dir, upload, delete, message):
+        from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+
+        operations = [
+            CommitOperationAdd(path, os.path.join(export_dir, path))
+            for path in upload + [MANIFEST_FILE]
+        ] + [CommitOperationDelete(path) for path in delete]
+        self.api.create_commit(
+            self.repo_id,
+            operations=operations,
+            commit_message=message,
+            repo_type="dataset",
+        )
+
+
+def publish(export_dir, remote):
+    """Transfers only the shards whose hash differs from the last published manifest."""
+    new = jsonio.read_json(os.path.join(export_dir, MANIFEST_FILE))
+    old = remote.read_manifest()
+    upload, delete = diff_manifests(old, new)
+    if old is None:
+        # First manifest-based publish: remove data files left by earlier uploads
+        delete = sorted(set(remote.list_shards()) - set(new["shards"]))
+
+    if not upload and not delete and old is not None:
+        print(f"{remote} is already up to date.")
+        return upload, delete
+
+    size = sum(new["shards"][path]["bytes"] for path in upload)
+    print(
+        f"Publishing to {remote}: {len(upload)} of {len(new['shards'])} shards changed "
+        f"({size / 1024**2:.1f} MB), {len(delete)} removed."
+    )
+    remote.apply(
+        export_dir,
+        upload,
+        delete,
+        f"Update {len(upload)} shards, remove {len(delete)} ({new['rows']} rows)",
+    )
+    return upload, delete
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Upload the merged benchmark to Hugging Face Hub"
     )
     parser.add_argument(
         "--repo_id",
         type=str,
-        required=True,
+        default=None,
         help="Your Hugging Face repository ID (e.g., 'username/swesat-skolprov-merged')",
     )
     parser.add_argument(
@@ -19,19 +196,41 @@ def main():
         default=None,
         help="Hugging Face token (optional if logged in via CLI)",
     )
-    args = parser.parse_args()
+    parser.add_argument("--dataset_file", type=str, default="merged_benchmark.jsonl")
+    parser.add_argument(
+        "--export_dir", type=str, default=os.path.join(".cache", "export")
+    )
+    parser.add_argument("--max_shard_mb", type=float, default=20)
+    parser.add_argument(
+        "--remote_dir",
+        type=str,
+        default=None,
+        help="Publish to this local directory instead of the Hub (for dry runs)",
+    )
+    args = parser.parse_args(argv)
+    if not args.repo_id and not args.remote_dir:
+        parser.error("one of --repo_id or --remote_dir is required")
 
-    print(f"Loading local dataset from 'merged_benchmark.jsonl'...")
-    dataset = load_dataset("json", data_files="merged_benchmark.jsonl", split="train")
+    print(f"Exporting {args.dataset_file} to shards in {args.export_dir}...")
+    with stage("export_shards") as record:
+        manifest = export_shards(
+            args.dataset_file,
+            args.export_dir,
+            max_shard_bytes=int(args.max_shard_mb * 1024**2),
+        )
+        record["items"] = manifest["rows"]
 
-    print(f"Uploading dataset to {args.repo_id} on Hugging Face Hub...")
-    if args.token:
-        # If token is provided, set it in environment or pass it
-        os.environ["HF_TOKEN"] = args.token
+    if args.remote_dir:
+        remote = LocalRemote(args.remote_dir)
+    else:
+        remote = HubRemote(args.repo_id, token=args.token)
 
-    dataset.push_to_hub(args.repo_id)
+    with stage("publish") as record:
+        upload, delete = publish(args.export_dir, remote)
+        record["items"] = len(upload) + len(delete)
     print("Upload complete!")
 
 
 if __name__ == "__main__":
-    main()
+    with pipeline_run("upload_to_hf"):
+        main()
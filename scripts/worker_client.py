@@ -0,0 +1,49 @@
+import json
+import urllib.error
+import urllib.request
+
+DEFAULT_WORKER_URL = "http://127.0.0.1:8765"
+
+
+def worker_health(worker_url, timeout=0.5):
+    """Returns the worker's /health payload, or None if no worker is listening."""
+    try:
+        with urllib.request.urlopen(f"{worker_url}/health", timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def submit(worker_url, items, timeout=600):
+    payload = {
+        "items": [
+            {
+                "system_prompt": item.get("system_prompt", ""),
+                "prompt": item.get("prompt", ""),
+            }
+            for item in items
+        ]
+    }
+    request = urllib.request.Request(
+        f"{worker_url}/generate",
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))["generations"]
+
+
+def connect_worker(worker_url, model_name):
+    """
+    Returns a generate_fn(items) -> generations backed by a running worker that serves
+    model_name, or None so the caller can fall back to loading the model in-process.
+    """
+    health = worker_health(worker_url)
+    if not health:
+        return None
+    if health.get("model") != model_name:
+        print(
+            f"Inference worker at {worker_url} serves {health.get('model')}, not {model_name}."
+        )
+        return None
+    return lambda items: submit(worker_url, items)
@@ -0,0 +1,139 @@
+import os
+import sys
+
+# The `swesat` command. Each subcommand names the module and function that implement
+# it; the module is only imported once its subcommand is chosen, so `swesat --help`
+# and light subcommands never pay for datasets, torch, transformers or pdfplumber.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRS = [
+    ROOT,
+    os.path.join(ROOT, "scripts"),
+    os.path.join(ROOT, "process_verbal_sections"),
+]
+
+# name: (module, function, pipeline run name or None, help)
+COMMANDS = {
+    "download": ("get_pdfs", "main", "get_pdfs", "Download the exam PDFs"),
+    "parse": (
+        "parse_exam_pdf",
+        "main",
+        "parse_exam_pdf",
+        "Parse the exam PDFs into exams/",
+    ),
+    "merge": (
+        "merge_benchmarks",
+        "main",
+        "merge_benchmarks",
+        "Merge SweSAT and Skolprov into merged_benchmark.jsonl",
+    ),
+    "add-superlim": (
+        "add_superlim",
+        "main",
+        "add_superlim",
+        "Append the SuperLim-2 tasks to merged_benchmark.jsonl",
+    ),
+    "build": (
+        "build_benchmark",
+        "main",
+        "build_benchmark",
+        "Incrementally build merged_benchmark.jsonl from all sources",
+    ),
+    "snapshots": (
+        "snapshots",
+        "main",
+        None,
+        "Pull or verify the local snapshots of the Hub datasets",
+    ),
+    "compare": (
+        "compare_benchmarks",
+        "main",
+        None,
+        "Count SweSAT questions that also appear in Skolprov",
+    ),
+    "eval": (
+        "evaluate_minilingua",
+        "main",
+        None,
+        "Evaluate a causal LM on the merged benchmark",
+    ),
+    "score": (
+        "scoring",
+        "main",
+        None,
+        "Re-score a results file with the task-aware answer matchers",
+    ),
+    "results": (
+        "results_store",
+        "main",
+        None,
+        "Query stored results: leaderboard, regressions, run diffs",
+    ),
+    "upload": (
+        "upload_to_hf",
+        "main",
+        "upload_to_hf",
+        "Publish the merged benchmark to Hugging Face Hub",
+    ),
+}
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = [
+        "usage: swesat [--root DIR] <command> [args...]",
+        "",
+        "Build, evaluate and publish the Swedish SweSAT benchmark.",
+        "",
+        "commands:",
+    ]
+    lines += [f"  {name:<{width}}  {spec[3]}" for name, spec in COMMANDS.items()]
+    lines += [
+        "",
+        "options:",
+        "  --root DIR  Run in DIR, the directory holding exams/ and merged_benchmark.jsonl",
+        "              (default: $SWESAT_ROOT or the current directory)",
+        "",
+        "Run `swesat <command> --help` for the options of a command.",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    root = os.environ.get("SWESAT_ROOT")
+    if argv[:1] == ["--root"] and len(argv) > 1:
+        root, argv = argv[1], argv[2:]
+    elif argv[:1] and argv[0].startswith("--root="):
+        root, argv = argv[0].split("=", 1)[1], argv[1:]
+
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    name, args = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"swesat: unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    # The scripts import each other and the shared root modules by bare name
+    for path in reversed(SOURCE_DIRS):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    if root:
+        os.chdir(root)
+
+    import importlib
+
+    module_name, function, run_name, _ = COMMANDS[name]
+    command = getattr(importlib.import_module(module_name), function)
+    # argparse names the program after argv[0]
+    sys.argv[0] = f"swesat {name}"
+    if run_name is None or "-h" in args or "--help" in args:
+        return command(args)
+    from instrumentation import pipeline_run
+
+    with pipeline_run(run_name):
+        return command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import json
+import pytest
+from add_superlim import config_items, repair_schema
+
+datasets = pytest.importorskip("datasets")
+
+
+def broken_config(rows):
+    """A config uploaded as TSV: each row's JSON is a string in column c0."""
+    return datasets.Dataset.from_dict(
+        {"c0": [json.dumps(row) for row in rows], "c1": [""] * len(rows)}
+    )
+
+
+def test_repaired_labels_keep_their_types():
+    rows = [
+        {"sentence_1": "a", "sentence_2": "b", "label": 1},
+        {"sentence_1": "c", "sentence_2": "d", "label": 4},
+        {"sentence_1": "e", "sentence_2": "f", "label": 4.2},
+    ]
+    repaired, mode = repair_schema(broken_config(rows))
+    assert mode == "column:c0"
+    items = config_items(repaired, "sweparaphrase")
+    assert [item["answer"] for item in items] == ["1", "4", "4.2"]
+    assert [item["uid"] for item in items] == [
+        f"superlim2-sweparaphrase-{i}" for i in range(3)
+    ]
+
+
+def test_repaired_mixed_str_and_int_labels():
+    rows = [
+        {"question": "Vad?", "candidate_answers": ["x", "y"], "label": 1},
+        {"question": "Hur?", "candidate_answers": ["x", "y"], "label": "okänd"},
+    ]
+    repaired, _ = repair_schema(broken_config(rows))
+    items = config_items(repaired, "swefaq")
+    assert [item["answer"] for item in items] == ["B", "okänd"]
+    assert items[0]["option_b"] == "y"
@@ -0,0 +1,53 @@
+from metrics import breakdown, group_labels, paired_comparison, results_to_arrays
+
+
+def result_rows(correct):
+    subsections = [("swesat", "ORD"), ("swesat", "LÄS"), ("superlim-2", "swenli")]
+    return [
+        {
+            "uid": f"item-{i}",
+            "source": subsections[i % 3][0],
+            "subsection": subsections[i % 3][1],
+            "correct": c,
+        }
+        for i, c in enumerate(correct)
+    ]
+
+
+def test_group_labels():
+    results = results_to_arrays(result_rows([True, False, True]))
+    assert list(group_labels(results, "overall")) == ["overall"] * 3
+    assert list(group_labels(results, "source")) == ["swesat", "swesat", "superlim-2"]
+    assert list(group_labels(results, "subsection")) == [
+        "swesat/ORD",
+        "swesat/LÄS",
+        "superlim-2/swenli",
+    ]
+
+
+def test_breakdown():
+    results = results_to_arrays(result_rows([True, False, True, True, True, False]))
+    report = breakdown(results, n_resamples=200)
+    assert [r["group"] for r in report["overall"]] == ["overall"]
+    assert report["overall"][0]["n"] == 6
+    assert report["overall"][0]["accuracy"] == 4 / 6
+    assert {r["group"]: r["n"] for r in report["source"]} == {
+        "superlim-2": 2,
+        "swesat": 4,
+    }
+    ord_row = next(r for r in report["subsection"] if r["group"] == "swesat/ORD")
+    assert ord_row["accuracy"] == 1.0
+    for rows in report.values():
+        for r in rows:
+            assert r["ci_low"] <= r["accuracy"] <= r["ci_high"]
+
+
+def test_paired_comparison():
+    a = results_to_arrays(result_rows([True, True, True, False, True, True]))
+    b = results_to_arrays(result_rows([True, False, True, False, False, True]))
+    rows = paired_comparison(a, b, by="source", n_resamples=200)
+    by_group = {r["group"]: r for r in rows}
+    assert by_group["swesat"]["n"] == 4
+    assert by_group["swesat"]["diff"] == 0.5
+    assert by_group["superlim-2"]["diff"] == 0.0
+    assert all(0.0 <= r["p_value"] <= 1.0 for r in rows)
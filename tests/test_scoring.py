@@ -0,0 +1,49 @@
+import pytest
+from add_superlim import SUPERLIM_TASKS
+from scoring import SCALE_TASKS, TASK_LABELS, TOKEN_TASKS, score, score_results
+
+CASES = [
+    # (subsection, answer, generation, parsed, correct)
+    ("ORD", "B", "Svar: B", "B", True),
+    ("ORD", "A", "Det rätta svaret är C", "C", False),
+    ("ORD", "A", "Jag vet inte", None, False),
+    ("argumentation-sentences", "con", "pro", "pro", False),
+    ("argumentation-sentences", "con", "Meningen är emot ämnet.", "con", True),
+    ("argumentation-sentences", "non", "Orelaterad", "non", True),
+    ("swewic", "Annan betydelse", "inte samma", "Annan betydelse", True),
+    ("swewic", "Samma betydelse", "Nej, inte samma.", "Annan betydelse", False),
+    ("swewic", "Samma betydelse", "same_sense", "Samma betydelse", True),
+    ("dalaj-ged-superlim", "Inkorrekt", "Meningen är inte korrekt.", "Inkorrekt", True),
+    ("dalaj-ged-superlim", "Korrekt", "not incorrect", "Korrekt", True),
+    ("swewinograd", "Korefererande", "inte korefererande", "not_coreferring", False),
+    ("swewinograd", "not_coreferring", "not_coreferring", "not_coreferring", True),
+    ("swenli", "Motsägelse", "Contradiction", "Motsägelse", True),
+    ("swenli", "Neutral", "inte neutral", None, False),
+    ("absabank-imm", "3", "Jag skulle säga 3,4", 3.4, True),
+    ("absabank-imm", "1.5", "9", None, False),
+    ("sweanalogy", "kvinna", "kung:drottning = man:Kvinna", "kvinna", True),
+]
+
+
+@pytest.mark.parametrize("subsection, answer, generation, parsed, correct", CASES)
+def test_score(subsection, answer, generation, parsed, correct):
+    item = {"subsection": subsection, "answer": answer}
+    assert score(item, generation) == (parsed, correct)
+
+
+def test_score_results_matches_score():
+    rows = [{"subsection": s, "answer": a, "prediction": g} for s, a, g, _, _ in CASES]
+    scores = score_results(rows)
+    assert list(scores["parsed"]) == [parsed for *_, parsed, _ in CASES]
+    assert list(scores["correct"]) == [correct for *_, correct in CASES]
+    assert list(scores["parseable"]) == [parsed is not None for *_, parsed, _ in CASES]
+
+
+def test_every_superlim_task_has_a_matcher():
+    for conf, task in SUPERLIM_TASKS.items():
+        assert (
+            conf in TASK_LABELS
+            or conf in SCALE_TASKS
+            or conf in TOKEN_TASKS
+            or "options" in task
+        ), conf
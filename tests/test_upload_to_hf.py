@@ -0,0 +1,42 @@
+import jsonio
+from upload_to_hf import LocalRemote, diff_manifests, export_shards, publish
+
+
+def manifest(**hashes):
+    shards = {f"data/{name}.jsonl": {"sha256": h} for name, h in hashes.items()}
+    return {"shards": shards}
+
+
+def test_diff_manifests():
+    old = manifest(a="1", b="2", c="3")
+    new = manifest(a="1", b="20", d="4")
+    upload, delete = diff_manifests(old, new)
+    # b changed and d was added; c was removed
+    assert upload == ["data/b.jsonl", "data/d.jsonl"]
+    assert delete == ["data/c.jsonl"]
+
+
+def test_diff_manifests_first_publish():
+    new = manifest(a="1", b="2")
+    assert diff_manifests(None, new) == (["data/a.jsonl", "data/b.jsonl"], [])
+
+
+def test_republish_uploads_nothing(tmp_path, capsys):
+    dataset_file = tmp_path / "merged_benchmark.jsonl"
+    rows = [
+        {"uid": f"{source}-{i}", "source": source, "subsection": "ORD", "prompt": "p"}
+        for source in ("swesat", "skolprov")
+        for i in range(3)
+    ]
+    jsonio.write_jsonl(str(dataset_file), rows)
+    export_dir = str(tmp_path / "export")
+    remote = LocalRemote(str(tmp_path / "remote"))
+
+    export_shards(str(dataset_file), export_dir)
+    upload, delete = publish(export_dir, remote)
+    assert len(upload) == 2 and delete == []
+    assert sorted(remote.list_shards()) == upload
+
+    export_shards(str(dataset_file), export_dir)
+    assert publish(export_dir, remote) == ([], [])
+    assert "already up to date" in capsys.readouterr().out